@@ -0,0 +1,128 @@
+"""
+Primary/replica database routing.
+
+Writes always go to ``default``. Reads go to one of REPLICA_DATABASES only
+while replica_reads() is active, which ReplicaReadMixin turns on for a
+viewset's ``replica_actions``, and never while a transaction is open on the
+primary. After a user's successful write request PrimaryPinMiddleware pins
+that user's reads to the primary for READ_YOUR_WRITES_SECONDS, so a fresh
+checkout or cart change is visible despite replication lag.
+
+With no replicas configured every query goes to ``default``. Any second
+alias works as a replica, so two SQLite files can stand in for a primary
+and its replica when exercising the routing locally.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Whether reads in the current request or task may use a replica
+_replica_reads = ContextVar('db_replica_reads', default=False)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Allow (or, with ``enabled=False``, forbid) replica reads in the block."""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def primary_pin_key(user_id):
+    return f"db:pin:{user_id}"
+
+
+def pin_to_primary(user_id, seconds=None):
+    """Send the user's reads to the primary for the next few seconds."""
+    cache.set(
+        primary_pin_key(user_id), True,
+        settings.READ_YOUR_WRITES_SECONDS if seconds is None else seconds
+    )
+
+
+def is_pinned_to_primary(user_id):
+    return cache.get(primary_pin_key(user_id), False)
+
+
+class ReplicaRouter:
+    def _replica(self):
+        replicas = settings.REPLICA_DATABASES
+        if not replicas or not _replica_reads.get():
+            return None
+        # Reads inside a transaction must see its own uncommitted writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return random.choice(replicas)
+
+    def db_for_read(self, model, **hints):
+        return self._replica()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """
+    Serve ``replica_actions`` of a viewset from a replica.
+
+    Runs after authentication so users pinned by a recent write keep
+    reading from the primary.
+    """
+    replica_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action not in self.replica_actions or not settings.REPLICA_DATABASES:
+            return
+        user = request.user
+        if user.is_authenticated and is_pinned_to_primary(user.pk):
+            return
+        self._replica_token = _replica_reads.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            _replica_reads.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class PrimaryPinMiddleware:
+    """Pin users to the primary after any successful write request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            settings.REPLICA_DATABASES
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            # DRF copies the authenticated user back onto the HttpRequest
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user.pk)
+        return response
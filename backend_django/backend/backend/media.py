@@ -0,0 +1,173 @@
+"""
+Media file serving that is fit for production.
+
+serve_media answers conditional GETs (ETag / Last-Modified) with 304, sets
+Cache-Control (a year and ``immutable`` for content-hashed image
+derivatives), and honours single byte-range requests. The bytes themselves
+are sent in one of three ways:
+
+* MEDIA_SENDFILE = 'x-accel-redirect': an empty response with an
+  X-Accel-Redirect header; nginx serves the file from an ``internal``
+  location at MEDIA_ACCEL_REDIRECT_PREFIX, handling ranges itself.
+* MEDIA_SENDFILE = 'x-sendfile': the same with X-Sendfile and the absolute
+  path, for Apache mod_xsendfile or lighttpd.
+* otherwise FileResponse, which WSGI servers with ``wsgi.file_wrapper``
+  (gunicorn, uWSGI) send with sendfile(). Partial responses are streamed in
+  blocks.
+
+Example nginx configuration for offloading::
+
+    location /protected-media/ {
+        internal;
+        alias /srv/storefront/media/;
+    }
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from store.images import DERIVED_DIR
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+BLOCK_SIZE = 64 * 1024
+
+
+def _etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _cache_control(path):
+    if path.startswith(DERIVED_DIR + '/'):
+        return f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+
+
+def parse_range(header, size):
+    """
+    Return ``(start, end)`` (inclusive) for a single-range ``Range`` header,
+    None to ignore the header (absent, malformed or multi-range: send the
+    whole file) or ``False`` if the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    if size == 0:
+        # No byte of an empty file can be addressed
+        return False
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _range_still_valid(request, etag, mtime):
+    # If-Range: only honour Range when the client's copy is current
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(mtime)
+
+
+def _read_range(full_path, start, length):
+    with open(full_path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(BLOCK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Media file not found")
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404("Media file not found")
+    if not os.path.isfile(full_path):
+        raise Http404("Media file not found")
+
+    etag = _etag(stat)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        response = _file_response(request, path, full_path, stat, etag)
+
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(stat.st_mtime)
+    response.headers['Cache-Control'] = _cache_control(path)
+    return response
+
+
+def _file_response(request, path, full_path, stat, etag):
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response.headers['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path)
+        return response
+    if settings.MEDIA_SENDFILE == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response.headers['X-Sendfile'] = full_path
+        return response
+
+    size = stat.st_size
+    byte_range = None
+    if _range_still_valid(request, etag, stat.st_mtime):
+        byte_range = parse_range(request.headers.get('Range'), size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response.headers['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+        response.headers['Content-Length'] = str(size)
+    elif byte_range is None:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _read_range(full_path, start, length), status=206, content_type=content_type
+        )
+        response.headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response.headers['Content-Length'] = str(length)
+
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
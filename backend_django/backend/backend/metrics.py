@@ -0,0 +1,219 @@
+"""
+Lightweight request instrumentation exported in Prometheus text format.
+
+MetricsMiddleware records, per route (URL name) and method, a latency
+histogram, database query count and time, and time spent calling external
+services such as PayPal. Samples are kept in process memory and served by
+metrics_view at /api/metrics/ to admin users. Set METRICS_SAMPLE_RATE to a
+fraction to sample only some requests, or to 0 to turn instrumentation off.
+"""
+from bisect import bisect_left
+from contextlib import ExitStack
+from contextvars import ContextVar
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Per-request accumulator for the request currently being sampled
+_current = ContextVar('metrics_current_request', default=None)
+
+
+class Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RouteStats:
+    __slots__ = ('latency', 'db_queries', 'db_seconds', 'outbound_seconds')
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.outbound_seconds = 0.0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes = {}
+        self.outbound = {}
+
+    def record_request(self, route, method, status, seconds, sample):
+        key = (route, method, str(status))
+        with self._lock:
+            stats = self.routes.get(key)
+            if stats is None:
+                stats = self.routes[key] = RouteStats()
+            stats.latency.observe(seconds)
+            stats.db_queries += sample.db_queries
+            stats.db_seconds += sample.db_seconds
+            stats.outbound_seconds += sample.outbound_seconds
+
+    def record_outbound(self, service, operation, seconds):
+        key = (service, operation)
+        with self._lock:
+            histogram = self.outbound.get(key)
+            if histogram is None:
+                histogram = self.outbound[key] = Histogram()
+            histogram.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.routes.clear()
+            self.outbound.clear()
+
+    def render(self):
+        with self._lock:
+            routes = sorted(self.routes.items())
+            outbound = sorted(self.outbound.items())
+            lines = []
+
+            _header(lines, 'storefront_request_duration_seconds', 'histogram',
+                    'Request latency by route')
+            for (route, method, status), stats in routes:
+                _histogram(lines, 'storefront_request_duration_seconds', stats.latency,
+                           route=route, method=method, status=status)
+
+            _header(lines, 'storefront_db_queries_total', 'counter',
+                    'Database queries issued by route')
+            for (route, method, status), stats in routes:
+                _sample(lines, 'storefront_db_queries_total', stats.db_queries,
+                        route=route, method=method, status=status)
+
+            _header(lines, 'storefront_db_query_seconds_total', 'counter',
+                    'Time spent in database queries by route')
+            for (route, method, status), stats in routes:
+                _sample(lines, 'storefront_db_query_seconds_total', stats.db_seconds,
+                        route=route, method=method, status=status)
+
+            _header(lines, 'storefront_outbound_seconds_total', 'counter',
+                    'Time spent calling external services by route')
+            for (route, method, status), stats in routes:
+                _sample(lines, 'storefront_outbound_seconds_total', stats.outbound_seconds,
+                        route=route, method=method, status=status)
+
+            _header(lines, 'storefront_outbound_request_duration_seconds', 'histogram',
+                    'External service call latency')
+            for (service, operation), histogram in outbound:
+                _histogram(lines, 'storefront_outbound_request_duration_seconds', histogram,
+                           service=service, operation=operation)
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _header(lines, name, kind, help_text):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {kind}')
+
+
+def _sample(lines, name, value, **labels):
+    lines.append(f'{name}{{{_labels(labels)}}} {value}')
+
+
+def _histogram(lines, name, histogram, **labels):
+    cumulative = 0
+    for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+        cumulative += count
+        _sample(lines, f'{name}_bucket', cumulative, **labels, le=bound)
+    _sample(lines, f'{name}_bucket', histogram.count, **labels, le='+Inf')
+    _sample(lines, f'{name}_sum', histogram.sum, **labels)
+    _sample(lines, f'{name}_count', histogram.count, **labels)
+
+
+registry = MetricsRegistry()
+
+
+class RequestSample:
+    __slots__ = ('db_queries', 'db_seconds', 'outbound_seconds')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.outbound_seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed with connection.execute_wrapper()
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.db_queries += 1
+
+
+def metrics_enabled():
+    return settings.METRICS_SAMPLE_RATE > 0
+
+
+def record_outbound(service, operation, seconds):
+    """Record the latency of a call to an external service."""
+    if not metrics_enabled():
+        return
+    registry.record_outbound(service, operation, seconds)
+    sample = _current.get()
+    if sample is not None:
+        sample.outbound_seconds += seconds
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.METRICS_SAMPLE_RATE
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+
+        sample = RequestSample()
+        token = _current.set(sample)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(sample))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        match = request.resolver_match
+        route = (match.view_name or match.route) if match else 'unmatched'
+        registry.record_request(
+            route, request.method, response.status_code,
+            time.perf_counter() - started, sample
+        )
+        return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics_view(request):
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
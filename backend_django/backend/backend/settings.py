@@ -42,23 +42,46 @@ INSTALLED_APPS = [
     'corsheaders',
     'store',
     'orders',
+    'users',
 ]
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'backend.throttling.TokenBucketThrottle',
+    ),
+}
+
+# Token-bucket limits for the expensive endpoints (see backend/throttling.py).
+# Registration and login hash passwords; checkout and payment call PayPal.
+THROTTLE_ENABLED = os.getenv('THROTTLE_ENABLED', 'True') == 'True'
+THROTTLE_SCOPES = {
+    'register': {'ip': '10/hour'},
+    'login': {'ip': '20/min'},
+    'checkout': {'user': '10/min', 'ip': '30/min'},
+    'payment': {'user': '20/min', 'ip': '60/min'},
 }
 
+# StatelessJWTAuthentication: seconds a user's active/staff flags are
+# trusted before re-reading them, and how many users to keep in memory
+JWT_USER_CACHE_TTL = int(os.getenv('JWT_USER_CACHE_TTL', '60'))
+JWT_USER_CACHE_SIZE = int(os.getenv('JWT_USER_CACHE_SIZE', '10000'))
+
+# Fraction of requests instrumented by MetricsMiddleware; 0 disables it
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', '1.0'))
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
 ]
 
 MIDDLEWARE = [
+    'backend.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -67,10 +90,56 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'backend.db_routers.PrimaryPinMiddleware',
+    'store.lookup.ProductLookupMiddleware',
 ]
 
+# Cache: local memory by default, Redis when REDIS_URL is set
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds a serialized catalog page stays cached; writes invalidate sooner
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', '300'))
+# Seconds a user's cart summary stays cached; cart writes invalidate sooner
+CART_SUMMARY_CACHE_TIMEOUT = int(os.getenv('CART_SUMMARY_CACHE_TIMEOUT', '300'))
+# In-process product rows used by cart and checkout (store.lookup)
+PRODUCT_LOOKUP_TTL = int(os.getenv('PRODUCT_LOOKUP_TTL', '5'))
+PRODUCT_LOOKUP_CACHE_SIZE = int(os.getenv('PRODUCT_LOOKUP_CACHE_SIZE', '5000'))
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Serve MEDIA_ROOT through backend.media.serve_media (works without DEBUG).
+# Turn off when the web server maps MEDIA_URL to MEDIA_ROOT itself.
+MEDIA_SERVE = os.getenv('MEDIA_SERVE', 'True') == 'True'
+# Hand file transfer to the web server: '' (Django streams the file),
+# 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache mod_xsendfile, lighttpd)
+MEDIA_SENDFILE = os.getenv('MEDIA_SENDFILE', '')
+# nginx `internal` location aliased to MEDIA_ROOT, used with x-accel-redirect
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+# Browser cache lifetime for media; content-hashed derivatives are immutable
+MEDIA_CACHE_MAX_AGE = int(os.getenv('MEDIA_CACHE_MAX_AGE', '86400'))
+
+# Product image derivatives: name -> longest side in pixels. Each size is
+# written as WebP plus a JPEG (PNG for transparent images) fallback.
+PRODUCT_IMAGE_SIZES = {
+    'thumb': 160,
+    'card': 480,
+    'large': 1200,
+}
+# Generate derivatives on a worker pool after upload rather than inline
+PRODUCT_IMAGE_ASYNC = os.getenv('PRODUCT_IMAGE_ASYNC', 'True') == 'True'
+PRODUCT_IMAGE_WORKERS = int(os.getenv('PRODUCT_IMAGE_WORKERS', '2'))
 
 ROOT_URLCONF = 'backend.urls'
 
@@ -103,9 +172,41 @@ DATABASES = {
         'PASSWORD': 'yourpassword',
         'HOST': 'localhost',
         'PORT': '5432',
+        # Reuse connections across requests instead of opening one per
+        # request; health checks replace ones the server has dropped
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
     }
 }
 
+# Connection pool (psycopg 3 with psycopg_pool). Django does not allow it
+# together with persistent connections, so DB_POOL turns CONN_MAX_AGE off.
+if os.getenv('DB_POOL', 'False') == 'True':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '20')),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        },
+    }
+
+# Read replica: set DATABASE_REPLICA_HOST to serve catalog browsing and order
+# history from it. Writes, and each user's reads for READ_YOUR_WRITES_SECONDS
+# after a write, stay on the primary.
+REPLICA_DATABASES = []
+if os.getenv('DATABASE_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.getenv('DATABASE_REPLICA_HOST'),
+        'PORT': os.getenv('DATABASE_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES = ['replica']
+
+DATABASE_ROUTERS = ['backend.db_routers.ReplicaRouter']
+READ_YOUR_WRITES_SECONDS = int(os.getenv('READ_YOUR_WRITES_SECONDS', '5'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -152,10 +253,47 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 SLACK_BOT_TOKEN = os.getenv('SLACK_BOT_TOKEN', '')  
 SLACK_CHANNEL_ID = os.getenv('SLACK_CHANNEL_ID', '')
 
+# Email (order notifications)
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'orders@example.com')
+
+# Transactional outbox: order events are delivered by dispatch_outbox to
+# these sinks (stub, slack, email), retried with exponential backoff
+OUTBOX_SINKS = [name for name in os.getenv('OUTBOX_SINKS', 'stub').split(',') if name]
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '8'))
+OUTBOX_BACKOFF_SECONDS = int(os.getenv('OUTBOX_BACKOFF_SECONDS', '10'))
+OUTBOX_MAX_BACKOFF_SECONDS = int(os.getenv('OUTBOX_MAX_BACKOFF_SECONDS', '3600'))
+# How long a dispatcher owns the events it claimed; one it has not finished
+# by then is given to the next dispatcher. Keep it above a batch's send time
+OUTBOX_LEASE_SECONDS = int(os.getenv('OUTBOX_LEASE_SECONDS', '300'))
+
 # PayPal Settings
 PAYPAL_MODE = 'sandbox'  # or 'live' for production
 PAYPAL_CLIENT_ID = 'Afyh9QS8tAbuWqRIi-BSWCR5vaxa5NoWP6zNYmu1L49gycFZyVfRq8THL5dvd6iUItQwQ_LGb37EYmY7'
 PAYPAL_CLIENT_SECRET = 'EPbu6C9vUyMVo8JNQuWaVKmxqEX7Qb2yM3xe2BK3rI-kXBqF2v7etOLxhXvHmVcpA4NrV85Ml5Yro-5L'
 PAYPAL_BRAND_NAME = "Ecommerce Storefront"
+# Overrides the sandbox/live API host, e.g. to point at a local fake PayPal server
+PAYPAL_BASE_URL = os.getenv('PAYPAL_BASE_URL', '')
+
+# Stripe webhooks
+STRIPE_WEBHOOK_SECRET = os.getenv('STRIPE_WEBHOOK_SECRET', '')
+# Times a stored webhook event is retried before it is marked failed
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv('WEBHOOK_MAX_ATTEMPTS', '5'))
+# Retry backoff for failed events: doubles from WEBHOOK_BACKOFF_SECONDS up to
+# WEBHOOK_MAX_BACKOFF_SECONDS, so a brief outage does not use up every attempt
+WEBHOOK_BACKOFF_SECONDS = int(os.getenv('WEBHOOK_BACKOFF_SECONDS', '30'))
+WEBHOOK_MAX_BACKOFF_SECONDS = int(os.getenv('WEBHOOK_MAX_BACKOFF_SECONDS', '3600'))
+
+# Checkout: when async, PayPal orders are created on a worker pool and the
+# client polls /api/orders/{id}/checkout-status/ instead of waiting
+CHECKOUT_ASYNC = os.getenv('CHECKOUT_ASYNC', 'False') == 'True'
+CHECKOUT_WORKERS = int(os.getenv('CHECKOUT_WORKERS', '8'))
+
+# How long a pending order holds its stock before release_expired_reservations
+# cancels it
+INVENTORY_RESERVATION_SECONDS = int(os.getenv('INVENTORY_RESERVATION_SECONDS', '1800'))
+# How long a PayPal capture in progress keeps its order from being cancelled
+# or expired. Longer than a capture can take, including a token refresh
+PAYPAL_CAPTURE_CLAIM_SECONDS = int(os.getenv('PAYPAL_CAPTURE_CLAIM_SECONDS', '120'))
 
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3000')
\ No newline at end of file
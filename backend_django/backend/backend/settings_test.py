@@ -0,0 +1,36 @@
+"""
+Settings for running the test suite on SQLite instead of PostgreSQL:
+
+    python manage.py test --settings=backend.settings_test
+
+The test databases are files rather than in-memory databases so tests can
+run threads against them. IMMEDIATE transactions make concurrent writers
+wait for the lock instead of failing with "database is locked".
+
+A second file stands in for a read replica. REPLICA_DATABASES stays empty so
+it gets its own migrated test database; routing tests turn it on with
+override_settings(REPLICA_DATABASES=['replica']).
+"""
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+
+_TEST_DIR = Path(tempfile.gettempdir())  # noqa: F405
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',  # noqa: F405
+        'OPTIONS': {'timeout': 30, 'transaction_mode': 'IMMEDIATE'},
+        'TEST': {'NAME': str(_TEST_DIR / 'storefront-test-default.sqlite3')},
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db-replica.sqlite3',  # noqa: F405
+        'OPTIONS': {'timeout': 30, 'transaction_mode': 'IMMEDIATE'},
+        'TEST': {'NAME': str(_TEST_DIR / 'storefront-test-replica.sqlite3')},
+    },
+}
+REPLICA_DATABASES = []
+
+MEDIA_ROOT = str(_TEST_DIR / 'storefront-test-media')
@@ -0,0 +1,84 @@
+"""
+Token-bucket throttling backed by the Django cache.
+
+Views opt in by naming a scope: ``throttle_scope = 'login'`` on an API view,
+or ``throttle_scopes = {'create': 'checkout'}`` on a viewset to pick a scope
+per action. THROTTLE_SCOPES gives each scope a bucket per client IP and/or
+per authenticated user, as DRF-style rates::
+
+    THROTTLE_SCOPES = {'checkout': {'user': '10/min', 'ip': '30/min'}}
+
+A '10/min' bucket holds 10 requests and refills at 10 per minute, so short
+bursts pass while sustained abuse is held to the rate. Each bucket is one
+cache entry ``(tokens, updated_at)``. A check reads all of a request's
+buckets with one get_many and takes a token from each only if every one
+has a token. A request denied by its user bucket therefore does not also
+drain its IP bucket, or the reverse. The read-modify-write is not atomic,
+so concurrent requests can overdraw a bucket slightly. That is the same
+trade-off DRF's own throttles make. Throttled requests get a 429 with
+Retry-After.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'10/min' -> (capacity 10, refill rate in tokens per second)."""
+    num, period = rate.split('/')
+    capacity = int(num)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+def refill(bucket, capacity, refill_rate, now):
+    """Tokens in a stored ``(tokens, updated_at)`` bucket, or a new one, at ``now``."""
+    tokens, updated_at = bucket or (capacity, now)
+    return min(capacity, tokens + (now - updated_at) * refill_rate)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle for the scope the view names; views without one are not limited."""
+
+    def get_scope(self, view):
+        scopes = getattr(view, 'throttle_scopes', None)
+        if scopes is not None:
+            return scopes.get(getattr(view, 'action', None))
+        return getattr(view, 'throttle_scope', None)
+
+    def allow_request(self, request, view):
+        self.retry_after = 0
+        if not settings.THROTTLE_ENABLED:
+            return True
+        scope = self.get_scope(view)
+        rates = settings.THROTTLE_SCOPES.get(scope) if scope else None
+        if not rates:
+            return True
+
+        now = time.time()
+        idents = {'ip': self.get_ident(request)}
+        if request.user and request.user.is_authenticated:
+            idents['user'] = request.user.pk
+        buckets = {
+            f"throttle:{scope}:{kind}:{ident}": parse_rate(rates[kind])
+            for kind, ident in idents.items() if kind in rates
+        }
+        stored = cache.get_many(buckets)
+        tokens = {}
+        for key, (capacity, refill_rate) in buckets.items():
+            tokens[key] = refill(stored.get(key), capacity, refill_rate, now)
+            if tokens[key] < 1:
+                self.retry_after = max(self.retry_after, (1 - tokens[key]) / refill_rate)
+        if self.retry_after:
+            return False
+
+        for key, (capacity, refill_rate) in buckets.items():
+            # Expire once the bucket would be full again anyway
+            cache.set(key, (tokens[key] - 1, now), int(capacity / refill_rate) + 1)
+        return True
+
+    def wait(self):
+        return self.retry_after
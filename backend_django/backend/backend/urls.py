@@ -21,12 +21,10 @@ from store import views as store_views
 from orders import views as order_views
 from orders.webhooks import stripe_webhook
 from django.conf import settings
-from django.conf.urls.static import static
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
-from users.views import RegisterView 
+from rest_framework_simplejwt.views import TokenRefreshView
+from users.views import RegisterView, ThrottledTokenObtainPairView
+from .media import serve_media
+from .metrics import metrics_view
 
 router = DefaultRouter()
 router.register(r'products', store_views.ProductViewSet, basename='product')
@@ -36,8 +34,14 @@ router.register(r'orders', order_views.OrderViewSet, basename='order')
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include(router.urls)),
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/token/', ThrottledTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/register/', RegisterView.as_view(), name='register'),
     path('api/webhooks/stripe/', stripe_webhook, name='stripe-webhook'),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path('api/metrics/', metrics_view, name='metrics'),
+]
+
+if settings.MEDIA_SERVE:
+    urlpatterns.append(
+        path(f"{settings.MEDIA_URL.lstrip('/')}<path:path>", serve_media, name='media')
+    )
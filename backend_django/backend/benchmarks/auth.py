@@ -0,0 +1,73 @@
+"""
+Per-request cost of JWT authentication: simplejwt's JWTAuthentication
+(one user query per request) versus StatelessJWTAuthentication.
+
+    python -m benchmarks.auth --requests 2000
+
+Times authenticate() alone, then a full GET /api/cart/ with each class, and
+counts the queries each issues.
+"""
+import argparse
+from unittest import mock
+
+from .harness import measure, print_table, setup_django, test_database
+
+
+def count_queries(fn):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as queries:
+        fn()
+    return len(queries)
+
+
+def run(requests):
+    from django.contrib.auth.models import User
+    from django.test import Client, RequestFactory
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.tokens import AccessToken
+    from store.views import CartItemViewSet
+    from users.authentication import StatelessJWTAuthentication, user_state_cache
+
+    user = User.objects.create_user('auth-benchmark', password='unused')
+    header = f"Bearer {AccessToken.for_user(user)}"
+    request = RequestFactory().get('/api/cart/', HTTP_AUTHORIZATION=header)
+    client = Client(HTTP_AUTHORIZATION=header)
+
+    def cold_authenticate():
+        user_state_cache.clear()
+        StatelessJWTAuthentication().authenticate(request)
+
+    rows = [
+        ('JWTAuthentication.authenticate', measure(
+            lambda: JWTAuthentication().authenticate(request), requests)),
+        ('Stateless, cold cache', measure(cold_authenticate, requests)),
+        ('Stateless, warm cache', measure(
+            lambda: StatelessJWTAuthentication().authenticate(request), requests)),
+    ]
+    queries = {}
+    for auth_class, label in ((JWTAuthentication, 'simplejwt'), (StatelessJWTAuthentication, 'stateless')):
+        name = auth_class.__name__
+        with mock.patch.object(CartItemViewSet, 'authentication_classes', [auth_class]):
+            queries[name] = count_queries(lambda: client.get('/api/cart/'))
+            rows.append((f"GET /api/cart/ ({label})",
+                         measure(lambda: client.get('/api/cart/'), requests // 4)))
+
+    print_table(rows)
+    for name, count in queries.items():
+        print(f"GET /api/cart/ with {name}: {count} queries")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(args.requests)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Requests/sec for GET /api/products/ before and after catalog caching.
+
+    python -m benchmarks.catalog --products 5000 --requests 500
+"""
+import argparse
+from decimal import Decimal
+from unittest import mock
+
+from .harness import measure, print_table, setup_django, test_database
+
+
+def seed_products(count):
+    from store.models import Product
+
+    Product.objects.bulk_create(
+        [
+            Product(
+                name=f"Product {i}",
+                description=f"Description for product {i}. " * 4,
+                price=Decimal(i % 500) + Decimal('0.99'),
+                inventory_count=i % 100,
+            )
+            for i in range(count)
+        ],
+        batch_size=1000,
+    )
+
+
+def run(products, requests):
+    from django.core.cache import cache
+    from django.test import Client
+    from rest_framework import viewsets
+    from store.views import ProductViewSet
+
+    seed_products(products)
+    client = Client()
+    rows = []
+
+    # Before: the whole active catalog serialized on every call
+    with mock.patch.object(ProductViewSet, 'pagination_class', None), \
+            mock.patch.object(ProductViewSet, 'list', viewsets.ReadOnlyModelViewSet.list):
+        rows.append(('unpaginated, uncached (before)', measure(
+            lambda: client.get('/api/products/'), max(requests // 20, 5), warmup=1
+        )))
+
+    def uncached():
+        cache.clear()
+        client.get('/api/products/')
+    rows.append(('paginated, cache miss', measure(uncached, requests)))
+
+    rows.append(('paginated, cache hit', measure(
+        lambda: client.get('/api/products/'), requests
+    )))
+
+    etag = client.get('/api/products/')['ETag']
+    rows.append(('conditional GET (304)', measure(
+        lambda: client.get('/api/products/', HTTP_IF_NONE_MATCH=etag), requests
+    )))
+
+    print(f"{products} active products")
+    print_table(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(args.products, args.requests)
+
+
+if __name__ == '__main__':
+    main()
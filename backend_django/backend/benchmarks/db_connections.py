@@ -0,0 +1,154 @@
+"""
+Database connection handling under concurrent load: a new connection per
+request (CONN_MAX_AGE=0) versus persistent connections with health checks
+versus a psycopg 3 connection pool.
+
+    python -m benchmarks.db_connections --requests 4000 --concurrency 16
+
+Each mode serves the same uncached product detail request from a local
+threaded WSGI server, with one keep-alive client session per thread. The
+report shows throughput, latency, and how many database connections were
+opened. Pool mode needs PostgreSQL with psycopg 3 and psycopg_pool and is
+skipped otherwise. Run it against PostgreSQL for meaningful numbers:
+opening a SQLite connection costs almost nothing.
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+from .harness import live_server, percentile, setup_django, test_database
+
+MODES = ('connect', 'persistent', 'pool')
+
+
+def pool_available(connection):
+    if connection.vendor != 'postgresql':
+        return False
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+    if not is_psycopg3:
+        return False
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def configure(mode, pool_size):
+    """Switch the default alias to ``mode`` for connections opened from now on."""
+    from django.db import connections
+
+    connection = connections['default']
+    if getattr(connection, 'pool', None) is not None:
+        connection.close_pool()
+    connections.close_all()
+
+    # Every thread's connection shares this dict, so later connections
+    # pick the change up
+    settings_dict = connections.settings['default']
+    options = settings_dict.setdefault('OPTIONS', {})
+    options.pop('pool', None)
+    settings_dict['CONN_HEALTH_CHECKS'] = mode == 'persistent'
+    settings_dict['CONN_MAX_AGE'] = 600 if mode == 'persistent' else 0
+    if mode == 'pool':
+        options['pool'] = {'min_size': pool_size, 'max_size': pool_size, 'timeout': 10}
+
+
+def hammer(url, requests, concurrency):
+    import requests as http
+
+    local = threading.local()
+    timings = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def one(_):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = http.Session()
+        t0 = time.perf_counter()
+        response = session.get(url)
+        elapsed = time.perf_counter() - t0
+        with lock:
+            timings.append(elapsed)
+            if response.status_code != 200:
+                errors[0] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    return {
+        'errors': errors[0],
+        'per_sec': requests / elapsed,
+        'p50_ms': percentile(timings, 50) * 1000,
+        'p99_ms': percentile(timings, 99) * 1000,
+    }
+
+
+def run(modes, requests, concurrency, pool_size):
+    from django.conf import settings
+    from django.db import connection
+    from django.db.backends.signals import connection_created
+
+    from store.models import Product
+
+    product = Product.objects.create(
+        name='Connection benchmark', description='', price='9.99',
+        inventory_count=10, status='active',
+    )
+    settings.ALLOWED_HOSTS = ['*']
+    settings.THROTTLE_ENABLED = False
+    settings.METRICS_SAMPLE_RATE = 0
+
+    opened = [0]
+    lock = threading.Lock()
+
+    def count_connection(sender, **kwargs):
+        with lock:
+            opened[0] += 1
+
+    connection_created.connect(count_connection)
+    if 'pool' in modes and not pool_available(connection):
+        print("pool: skipped (needs PostgreSQL with psycopg 3 and psycopg_pool)")
+        modes = [mode for mode in modes if mode != 'pool']
+
+    rows = []
+    with live_server() as base:
+        url = f"{base}/api/products/{product.id}/"
+        for mode in modes:
+            configure(mode, pool_size)
+            hammer(url, concurrency * 2, concurrency)  # warm up
+            opened[0] = 0
+            result = hammer(url, requests, concurrency)
+            rows.append((mode, result, opened[0]))
+        configure('connect', pool_size)
+
+    print(f"{'mode':<14}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'connects':>10}{'errors':>8}")
+    for mode, result, connects in rows:
+        print(
+            f"{mode:<14}{result['per_sec']:>10.1f}{result['p50_ms']:>10.2f}"
+            f"{result['p99_ms']:>10.2f}{connects:>10}{result['errors']:>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--pool-size', type=int, default=8,
+                        help='Pool size in pool mode, below --concurrency to show queueing')
+    parser.add_argument('--modes', default=','.join(MODES),
+                        help=f"Comma-separated subset of {', '.join(MODES)}")
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(args.modes.split(','), args.requests, args.concurrency, args.pool_size)
+
+
+if __name__ == '__main__':
+    main()
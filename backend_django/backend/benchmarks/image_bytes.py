@@ -0,0 +1,86 @@
+"""
+Bytes transferred for one catalog page: JSON plus the images it references,
+serving the original uploads versus the pre-generated card-size WebP.
+
+    python -m benchmarks.image_bytes --page-size 24 --width 3000 --height 2250
+
+Uploads are synthetic photos (noise over gradients) so that they compress
+like real pictures rather than flat colour.
+"""
+import argparse
+from io import BytesIO
+import shutil
+import tempfile
+
+from .harness import setup_django, test_database
+
+
+def make_photo(width, height, seed):
+    from PIL import Image, ImageFilter
+
+    noise = Image.effect_noise((width, height), 40 + seed % 30).convert('RGB')
+    gradient = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    image = Image.blend(noise, gradient, 0.5).filter(ImageFilter.GaussianBlur(1))
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def run(page_size, width, height):
+    from django.core.files.base import ContentFile
+    from django.test import Client, override_settings
+    from store.images import generate_product_images
+    from store.models import Product
+
+    with override_settings(PRODUCT_IMAGE_ASYNC=False):
+        for i in range(page_size):
+            product = Product(name=f"Product {i}", description="Benchmark product", price='9.99',
+                              inventory_count=10)
+            product.image.save(f"bench-{i}.jpg", ContentFile(make_photo(width, height, i)), save=True)
+
+    ids = list(Product.objects.values_list('id', flat=True))
+    for product_id in ids:
+        generate_product_images(product_id)
+
+    response = Client().get('/api/products/', {'page_size': page_size})
+    json_bytes = len(response.content)
+    results = response.json()['results']
+
+    storage = Product._meta.get_field('image').storage
+    prefix = 'http://testserver' + storage.base_url
+
+    def size_of(url):
+        return storage.size(url[len(prefix):])
+
+    original = sum(size_of(p['image']) for p in results)
+    rows = [('original uploads', original)]
+    for size in results[0]['images']:
+        for fmt in ('webp', 'jpeg'):
+            rows.append((f"{size} {fmt}", sum(size_of(p['images'][size][fmt]) for p in results)))
+
+    print(f"{len(results)} products per page, {width}x{height} uploads, JSON {json_bytes / 1024:.1f} KiB")
+    print(f"{'images served':<24}{'KiB/page':>12}{'image bytes vs original':>26}")
+    for name, total in rows:
+        print(f"{name:<24}{(total + json_bytes) / 1024:>12.1f}{original / total:>25.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--page-size', type=int, default=24)
+    parser.add_argument('--width', type=int, default=3000)
+    parser.add_argument('--height', type=int, default=2250)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import override_settings
+
+    media_root = tempfile.mkdtemp(prefix='bench-media-')
+    try:
+        with override_settings(MEDIA_ROOT=media_root), test_database():
+            run(args.page_size, args.width, args.height)
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,392 @@
+"""
+End-to-end load test of the storefront API.
+
+Each virtual user logs in, browses and searches the catalog, edits their
+cart, checks out, verifies the PayPal payment, receives the Stripe webhook,
+reads their order history and cancels a second order. Latency percentiles
+are measured client-side per route. Queries per request come from the
+server's /api/metrics/ endpoint, read before and after the run.
+
+By default everything runs locally: a throwaway database seeded with
+seed_storefront, the fake PayPal server, and the project on a threaded
+WSGI server.
+
+    python -m benchmarks.load --users 8 --iterations 5
+
+To load an existing deployment instead, seed it with
+``manage.py seed_storefront``, and point PAYPAL_BASE_URL at
+``manage.py fake_paypal``, and set THROTTLE_ENABLED=False. Then pass --url
+and the STRIPE_WEBHOOK_SECRET it uses:
+
+    python -m benchmarks.load --url http://localhost:8000 --secret whsec_...
+
+Against SQLite, give the test database a file NAME and
+``'OPTIONS': {'transaction_mode': 'IMMEDIATE'}``, or concurrent checkouts
+fail with "database is locked".
+
+CI gate: record a baseline once, then compare later runs against it. The
+script exits 1 on any error response, and on a route whose queries per
+request (or, unless --no-latency-gate, p95) grew past the tolerances:
+
+    python -m benchmarks.load --save-baseline load-baseline.json
+    python -m benchmarks.load --baseline load-baseline.json
+"""
+import argparse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from .harness import live_server, percentile, setup_django, test_database
+from .webhook_load import DEFAULT_SECRET, sign
+
+SEARCH_TERMS = ['leather', 'wireless', 'mug', 'jacket', 'lamp', 'premium']
+MEDIA_FILE = 'products/load-test.jpg'
+
+METRIC_RE = re.compile(r'^(\w+)\{(.*)\} (\S+)$')
+LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+class UnexpectedResponse(Exception):
+    pass
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, route, seconds, ok):
+        with self.lock:
+            self.timings[route].append(seconds)
+            if not ok:
+                self.errors[route] += 1
+
+
+class VirtualUser:
+    def __init__(self, base, username, password, recorder, secret):
+        import requests
+
+        self.base = base
+        self.username = username
+        self.password = password
+        self.recorder = recorder
+        self.secret = secret
+        self.session = requests.Session()
+
+    def call(self, route, method, path, expect=(200, 201), **kwargs):
+        """Send a request and record its latency under ``(route, method)``."""
+        url = path if path.startswith('http') else self.base + path
+        started = time.perf_counter()
+        response = self.session.request(method, url, **kwargs)
+        ok = response.status_code in expect
+        self.recorder.record((route, method), time.perf_counter() - started, ok)
+        if not ok:
+            raise UnexpectedResponse(
+                f"{method} {path} -> {response.status_code}: {response.text[:200]}"
+            )
+        return response
+
+    def login(self):
+        data = self.call('token_obtain_pair', 'POST', '/api/token/', json={
+            'username': self.username, 'password': self.password,
+        }).json()
+        self.session.headers['Authorization'] = f"Bearer {data['access']}"
+        self.refresh = data['refresh']
+
+    def checkout(self, items):
+        response = self.call('order-list', 'POST', '/api/orders/', expect=(200, 201, 202),
+                             json={'items': items})
+        data = response.json()
+        if response.status_code == 202:
+            order_id = data['order']
+            while 'id' not in data:
+                if data['status'] == 'failed':
+                    raise UnexpectedResponse(f"Checkout of order {order_id} failed")
+                time.sleep(0.05)
+                data = self.call('order-checkout-status', 'GET',
+                                 f'/api/orders/{order_id}/checkout-status/').json()
+            return order_id, data['id']
+        # The synchronous response carries only the PayPal order
+        latest = self.call('order-list', 'GET', '/api/orders/?page_size=1').json()
+        return latest['results'][0]['id'], data['id']
+
+    def scenario(self, iteration):
+        self.login()
+        self.call('api-root', 'GET', '/api/')
+
+        # Browse
+        page = self.call('product-list', 'GET', '/api/products/').json()
+        if page['next']:
+            self.call('product-list', 'GET', page['next'])
+        products = page['results']
+        term = SEARCH_TERMS[iteration % len(SEARCH_TERMS)]
+        self.call('product-search', 'GET', f'/api/products/search/?q={term}&max_price=400')
+        product = products[iteration % len(products)]
+        self.call('product-detail', 'GET', f"/api/products/{product['id']}/")
+        self.call('media', 'GET', f'/media/{MEDIA_FILE}', expect=(200, 404))
+
+        # Cart
+        picks = [products[(iteration + i) % len(products)]['id'] for i in range(3)]
+        self.call('cart-bulk', 'POST', '/api/cart/bulk/', json={
+            'mode': 'set',
+            'items': [{'product_id': product_id, 'quantity': 1} for product_id in picks[:2]],
+        })
+        self.call('cart-summary', 'GET', '/api/cart/summary/')
+        self.call('cart-list', 'POST', '/api/cart/', json={'product_id': picks[2], 'quantity': 1})
+        cart = self.call('cart-list', 'GET', '/api/cart/').json()
+        by_product = {item['product']['id']: item['id'] for item in cart}
+        self.call('cart-detail', 'PUT', f'/api/cart/{by_product[picks[0]]}/', json={'quantity': 2})
+        self.call('cart-detail', 'DELETE', f'/api/cart/{by_product[picks[2]]}/',
+                  expect=(200, 204))
+
+        # Checkout and payment
+        order_id, paypal_order_id = self.checkout([
+            {'product': picks[0], 'quantity': 2},
+            {'product': picks[1], 'quantity': 1},
+        ])
+        self.call('order-verify-payment', 'POST', '/api/orders/verify-payment/',
+                  json={'orderID': paypal_order_id})
+        self.stripe_webhook(order_id)
+
+        # History
+        self.call('order-list', 'GET', '/api/orders/')
+        self.call('order-detail', 'GET', f'/api/orders/{order_id}/')
+        self.call('order-checkout-status', 'GET', f'/api/orders/{order_id}/checkout-status/')
+
+        # Abandoned checkout
+        cancelled_id, _ = self.checkout([{'product': picks[1], 'quantity': 1}])
+        self.call('order-cancel', 'POST', f'/api/orders/{cancelled_id}/cancel/')
+
+        self.call('token_refresh', 'POST', '/api/token/refresh/', json={'refresh': self.refresh})
+
+    def stripe_webhook(self, order_id):
+        payload = json.dumps({
+            'id': f"evt_{uuid.uuid4().hex}",
+            'object': 'event',
+            'type': 'payment_intent.succeeded',
+            'data': {'object': {
+                'id': f"pi_{uuid.uuid4().hex[:24]}",
+                'object': 'payment_intent',
+                'metadata': {'order_id': str(order_id)},
+            }},
+        }).encode()
+        self.call('stripe-webhook', 'POST', '/api/webhooks/stripe/', data=payload, headers={
+            'Content-Type': 'application/json',
+            'Stripe-Signature': sign(payload, self.secret),
+        })
+
+    def register(self):
+        name = f"load-{uuid.uuid4().hex[:12]}"
+        self.call('register', 'POST', '/api/register/', json={
+            'username': name, 'email': f"{name}@example.com",
+            'password': 'Load-test-pass-1', 'password2': 'Load-test-pass-1',
+        })
+
+
+def read_metrics(base, prefix, password):
+    """Return ``{(route, method): [requests, queries]}`` from /api/metrics/."""
+    import requests
+
+    session = requests.Session()
+    token = session.post(f"{base}/api/token/", json={
+        'username': f"{prefix}-admin", 'password': password,
+    }).json()['access']
+    text = session.get(f"{base}/api/metrics/", headers={'Authorization': f"Bearer {token}"}).text
+
+    totals = defaultdict(lambda: [0, 0])
+    for line in text.splitlines():
+        match = METRIC_RE.match(line)
+        if not match:
+            continue
+        name, labels, value = match.groups()
+        labels = dict(LABEL_RE.findall(labels))
+        if name == 'storefront_request_duration_seconds_count':
+            totals[(labels['route'], labels['method'])][0] += float(value)
+        elif name == 'storefront_db_queries_total':
+            totals[(labels['route'], labels['method'])][1] += float(value)
+    return totals
+
+
+def queries_per_request(before, after):
+    result = {}
+    for key, (requests, queries) in after.items():
+        base_requests, base_queries = before.get(key, (0, 0))
+        if requests > base_requests:
+            result[key] = (queries - base_queries) / (requests - base_requests)
+    return result
+
+
+def run_load(args, base):
+    recorder = Recorder()
+    before = read_metrics(base, args.prefix, args.password)
+
+    def worker(index):
+        user = VirtualUser(base, f"{args.prefix}{index}", args.password, recorder, args.secret)
+        failures = []
+        if index == 0:
+            user.register()
+        for iteration in range(args.iterations):
+            try:
+                user.scenario(iteration)
+            except UnexpectedResponse as e:
+                failures.append(str(e))
+        return failures
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        failures = [f for result in pool.map(worker, range(args.users)) for f in result]
+    elapsed = time.perf_counter() - started
+
+    queries = queries_per_request(before, read_metrics(base, args.prefix, args.password))
+    report = {}
+    for (route, method), timings in sorted(recorder.timings.items()):
+        timings.sort()
+        report[f"{route} {method}"] = {
+            'count': len(timings),
+            'errors': recorder.errors.get((route, method), 0),
+            'p50_ms': round(percentile(timings, 50) * 1000, 2),
+            'p95_ms': round(percentile(timings, 95) * 1000, 2),
+            'p99_ms': round(percentile(timings, 99) * 1000, 2),
+            'queries': round(queries[(route, method)], 2) if (route, method) in queries else None,
+        }
+    total = sum(row['count'] for row in report.values())
+    print(f"{args.users} users x {args.iterations} iterations: {total} requests in {elapsed:.1f}s "
+          f"({total / elapsed:.1f} req/s)")
+    return report, failures
+
+
+def print_report(report):
+    print(f"{'route':<34}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}")
+    for name, row in report.items():
+        queries = f"{row['queries']:.1f}" if row['queries'] is not None else '-'
+        print(
+            f"{name:<34}{row['count']:>7}{row['errors']:>8}{row['p50_ms']:>10.2f}"
+            f"{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}{queries:>9}"
+        )
+
+
+def unexercised_routes(report):
+    from django.urls import get_resolver
+
+    # /api/metrics/ is read around the run rather than timed
+    exercised = {name.rsplit(' ', 1)[0] for name in report} | {'metrics'}
+    names = {key for key in get_resolver().reverse_dict if isinstance(key, str)}
+    return sorted(names - exercised)
+
+
+def compare(report, baseline, args):
+    regressions = []
+    for name, row in report.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        if row['queries'] is not None and old['queries'] is not None:
+            if row['queries'] > old['queries'] * (1 + args.query_tolerance) + 0.5:
+                regressions.append(f"{name}: {row['queries']:.1f} queries/request (baseline {old['queries']:.1f})")
+        if not args.no_latency_gate and row['p95_ms'] > old['p95_ms'] * (1 + args.latency_tolerance):
+            regressions.append(f"{name}: p95 {row['p95_ms']:.1f} ms (baseline {old['p95_ms']:.1f} ms)")
+    return regressions
+
+
+def run_local(args):
+    from django.core.management import call_command
+    from django.test import override_settings
+
+    from orders.fake_paypal import make_server
+
+    paypal = make_server(latency=args.paypal_latency)
+    threading.Thread(target=paypal.serve_forever, daemon=True).start()
+    media_root = tempfile.mkdtemp(prefix='load-media-')
+    os.makedirs(os.path.join(media_root, 'products'))
+    with open(os.path.join(media_root, MEDIA_FILE), 'wb') as f:
+        f.write(os.urandom(50 * 1024))
+
+    try:
+        with override_settings(
+            PAYPAL_BASE_URL=f"http://127.0.0.1:{paypal.server_port}",
+            STRIPE_WEBHOOK_SECRET=args.secret,
+            ALLOWED_HOSTS=['127.0.0.1'],
+            MEDIA_ROOT=media_root,
+            CHECKOUT_ASYNC=args.async_checkout,
+            # Every virtual user shares 127.0.0.1 and would hit the login limit
+            THROTTLE_ENABLED=False,
+            DEBUG=False,
+        ):
+            call_command(
+                'seed_storefront', products=args.products, users=args.users,
+                prefix=args.prefix, password=args.password,
+            )
+            with live_server() as base:
+                report, failures = run_load(args, base)
+            missing = unexercised_routes(report)
+    finally:
+        paypal.shutdown()
+        shutil.rmtree(media_root, ignore_errors=True)
+    return report, failures, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--users', type=int, default=8, help="Concurrent virtual users")
+    parser.add_argument('--iterations', type=int, default=5, help="Scenario runs per user")
+    parser.add_argument('--products', type=int, default=2000, help="Products to seed (local mode)")
+    parser.add_argument('--paypal-latency', type=float, default=0.05,
+                        help="Seconds the fake PayPal waits per call (local mode)")
+    parser.add_argument('--async-checkout', action='store_true',
+                        help="Run with CHECKOUT_ASYNC (local mode)")
+    parser.add_argument('--url', help="Load a running server instead of a local one")
+    parser.add_argument('--prefix', default='loaduser', help="seed_storefront username prefix")
+    parser.add_argument('--password', default='loadtest-pass')
+    parser.add_argument('--secret', default=DEFAULT_SECRET, help="STRIPE_WEBHOOK_SECRET of the server")
+    parser.add_argument('--json', help="Also write the report to this file")
+    parser.add_argument('--save-baseline', help="Write the report as a baseline")
+    parser.add_argument('--baseline', help="Fail on regressions against this baseline")
+    parser.add_argument('--query-tolerance', type=float, default=0.1)
+    parser.add_argument('--latency-tolerance', type=float, default=0.5)
+    parser.add_argument('--no-latency-gate', action='store_true',
+                        help="Only gate on queries per request, e.g. on noisy CI machines")
+    args = parser.parse_args()
+
+    setup_django()
+    if args.url:
+        report, failures = run_load(args, args.url.rstrip('/'))
+        missing = []
+    else:
+        with test_database():
+            report, failures, missing = run_local(args)
+
+    print_report(report)
+    if missing:
+        print(f"Routes not exercised: {', '.join(missing)}")
+    for failure in failures[:10]:
+        print(f"FAILED {failure}")
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+
+    exit_code = 1 if failures else 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            exit_code = 1
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
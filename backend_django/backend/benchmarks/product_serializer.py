@@ -0,0 +1,88 @@
+"""
+ProductSerializer versus the fast read path over N products.
+
+    python -m benchmarks.product_serializer --products 10000
+
+Also checks that both paths render byte-identical JSON.
+"""
+import argparse
+import time
+
+from .catalog import seed_products
+from .harness import setup_django, test_database
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(products, repeat):
+    from django.test import RequestFactory
+    from rest_framework.renderers import JSONRenderer
+    from store.models import Product
+    from store.serializers import (
+        PRODUCT_FIELDS,
+        ProductRepresenter,
+        ProductSerializer,
+    )
+
+    seed_products(products)
+    # Give every other product an image so URL building is exercised
+    Product.objects.filter(id__in=list(Product.objects.values_list('id', flat=True))[::2]).update(
+        image='products/sample.jpg'
+    )
+    request = RequestFactory().get('/api/products/')
+    instances = list(Product.objects.all())
+    rows = list(Product.objects.values(*PRODUCT_FIELDS))
+    renderer = JSONRenderer()
+    representer = ProductRepresenter(request)
+
+    baseline = renderer.render(
+        ProductSerializer(instances, many=True, context={'request': request}).data
+    )
+    fast_instances = renderer.render(
+        [representer.from_instance(p) for p in instances]
+    )
+    fast_rows = renderer.render(
+        [representer.from_row(r) for r in rows]
+    )
+    assert fast_instances == baseline, "instance fast path differs from ProductSerializer"
+    assert fast_rows == baseline, "values() fast path differs from ProductSerializer"
+
+    cases = [
+        ('ProductSerializer(many=True)', lambda: ProductSerializer(
+            instances, many=True, context={'request': request}
+        ).data),
+        ('ProductRepresenter.from_instance', lambda: [
+            representer.from_instance(p) for p in instances
+        ]),
+        ('ProductRepresenter.from_row', lambda: [
+            representer.from_row(r) for r in rows
+        ]),
+    ]
+    print(f"{products} products, output identical ({len(baseline)} bytes)")
+    baseline_time = None
+    for name, fn in cases:
+        elapsed = best_of(fn, repeat)
+        baseline_time = baseline_time or elapsed
+        print(f"{name:<32}{elapsed * 1000:>10.1f} ms{baseline_time / elapsed:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(args.products, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Guard against N+1 queries on the list endpoints.
+
+The test suite enforces exact counts with assertNumQueries
+(ListQueryCountTests in store/tests.py, OrderHistoryQueryCountTests in
+orders/tests.py). This script is a quick report across endpoints: each
+list endpoint is requested against a small and a large dataset, and the
+script exits non-zero if any endpoint's query count grows with result size.
+
+    python -m benchmarks.query_counts
+"""
+import argparse
+import sys
+from decimal import Decimal
+
+from .harness import setup_django, test_database
+
+LIST_ENDPOINTS = [
+    '/api/products/',
+    '/api/cart/',
+    '/api/orders/',
+]
+
+
+def seed_user(username, size):
+    from django.contrib.auth.models import User
+    from orders.models import Order, OrderItem
+    from store.models import CartItem, Product
+
+    user = User.objects.create_user(username=username, password='benchmark')
+    products = Product.objects.bulk_create([
+        Product(
+            name=f"{username} product {i}",
+            description="Query count fixture",
+            price=Decimal('10.00'),
+            inventory_count=100,
+        )
+        for i in range(size)
+    ])
+    CartItem.objects.bulk_create([
+        CartItem(user=user, product=product, quantity=1) for product in products
+    ])
+    orders = Order.objects.bulk_create([
+        Order(user=user, total_amount=Decimal('30.00')) for _ in range(size)
+    ])
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, product=product, quantity=1, unit_price=product.price)
+        for order in orders
+        for product in products[:3]
+    ])
+    return user
+
+
+def count_queries(user, url, page_size):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+
+    cache.clear()
+    client = APIClient()
+    client.force_authenticate(user)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, {'page_size': page_size})
+    assert response.status_code == 200, (url, response.status_code)
+    return len(queries)
+
+
+def run(small, large):
+    small_user = seed_user('small', small)
+    large_user = seed_user('large', large)
+
+    failed = False
+    print(f"{'endpoint':<24}{small:>8}{large:>8}")
+    for url in LIST_ENDPOINTS:
+        small_count = count_queries(small_user, url, small)
+        large_count = count_queries(large_user, url, large)
+        grows = large_count > small_count
+        failed |= grows
+        print(f"{url:<24}{small_count:>8}{large_count:>8}{'  GROWS' if grows else ''}")
+    return not failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--small', type=int, default=3)
+    parser.add_argument('--large', type=int, default=30)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        ok = run(args.small, args.large)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""
+Load test for the Stripe webhook accept path and the event workers.
+
+Posts signed ``payment_intent.succeeded`` events (a share of them
+redelivered, as Stripe does on timeouts), reports accept latency, then times
+draining the queue with process_webhook_events.
+
+    python -m benchmarks.webhook_load --events 10000 --workers 4
+
+By default requests go through Django's test client against a throwaway
+database. Pass --url to post to a running server instead, e.g.
+``--url http://localhost:8000/api/webhooks/stripe/`` with the same
+STRIPE_WEBHOOK_SECRET; the drain step is then left to that deployment's
+workers.
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+import hashlib
+import hmac
+import json
+import time
+
+from .harness import print_table, setup_django, summarize, test_database
+
+DEFAULT_SECRET = 'whsec_benchmark'
+
+
+def sign(payload, secret, timestamp=None):
+    """Build a Stripe-Signature header for ``payload`` (bytes)."""
+    timestamp = int(timestamp or time.time())
+    signed = f"{timestamp}.".encode() + payload
+    signature = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def make_event(index, order_id):
+    return json.dumps({
+        'id': f"evt_load_{index}",
+        'object': 'event',
+        'type': 'payment_intent.succeeded',
+        'data': {'object': {
+            'id': f"pi_load_{index}",
+            'object': 'payment_intent',
+            'metadata': {'order_id': str(order_id)},
+        }},
+    }).encode()
+
+
+def seed_orders(count):
+    from django.contrib.auth.models import User
+    from orders.models import Order
+
+    user = User.objects.create_user('webhook-load', password='unused')
+    Order.objects.bulk_create(
+        [
+            Order(user=user, total_amount=Decimal('10.00'))
+            for _ in range(count)
+        ],
+        batch_size=1000,
+    )
+    return list(Order.objects.values_list('id', flat=True))
+
+
+def build_payloads(events, order_ids, duplicate_rate):
+    payloads = [make_event(i, order_ids[i % len(order_ids)]) for i in range(events)]
+    step = int(1 / duplicate_rate) if duplicate_rate else 0
+    if step:
+        payloads += payloads[::step]
+    return payloads
+
+
+def post_all(post, payloads, concurrency):
+    timings = []
+
+    def timed(payload):
+        t0 = time.perf_counter()
+        status = post(payload)
+        timings.append(time.perf_counter() - t0)
+        return status
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            statuses = list(pool.map(timed, payloads))
+    else:
+        statuses = [timed(payload) for payload in payloads]
+    elapsed = time.perf_counter() - started
+
+    errors = sum(1 for status in statuses if status != 200)
+    return summarize(timings, elapsed), errors
+
+
+def run_local(args):
+    from django.core.management import call_command
+    from django.test import Client, override_settings
+    from orders.models import Order, WebhookEvent
+
+    order_ids = seed_orders(min(args.events, 1000))
+    payloads = build_payloads(args.events, order_ids, args.duplicate_rate)
+    client = Client()
+
+    def post(payload):
+        return client.post(
+            '/api/webhooks/stripe/', payload, content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=sign(payload, args.secret),
+        ).status_code
+
+    with override_settings(STRIPE_WEBHOOK_SECRET=args.secret):
+        accept, errors = post_all(post, payloads, 1)
+
+    stored = WebhookEvent.objects.count()
+    started = time.perf_counter()
+    call_command('process_webhook_events', workers=args.workers, batch_size=args.batch_size)
+    drain = time.perf_counter() - started
+
+    print(f"{len(payloads)} deliveries, {stored} unique events stored, {errors} non-200")
+    print_table([('accept (POST /api/webhooks/stripe/)', accept)])
+    print(
+        f"drained in {drain:.2f}s ({stored / drain:.0f} events/s); "
+        f"{WebhookEvent.objects.filter(status='processed').count()} processed, "
+        f"{Order.objects.filter(status='paid').count()} orders paid"
+    )
+
+
+def run_remote(args):
+    import requests
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    payloads = build_payloads(args.events, [args.order_id], args.duplicate_rate)
+
+    def post(payload):
+        return session.post(
+            args.url, data=payload,
+            headers={
+                'Content-Type': 'application/json',
+                'Stripe-Signature': sign(payload, args.secret),
+            },
+        ).status_code
+
+    accept, errors = post_all(post, payloads, args.concurrency)
+    print(f"{len(payloads)} deliveries, {errors} non-200")
+    print_table([('accept (POST webhook)', accept)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=10000)
+    parser.add_argument(
+        '--duplicate-rate', type=float, default=0.1,
+        help="Fraction of events delivered a second time"
+    )
+    parser.add_argument('--workers', type=int, default=4, help="process_webhook_events workers")
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--secret', default=DEFAULT_SECRET)
+    parser.add_argument('--url', help="Post to a running server instead of in-process")
+    parser.add_argument('--concurrency', type=int, default=16, help="Client threads with --url")
+    parser.add_argument('--order-id', type=int, default=1, help="Order referenced by events with --url")
+    args = parser.parse_args()
+
+    if args.url:
+        run_remote(args)
+        return
+
+    setup_django()
+    with test_database():
+        run_local(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import Order, OrderItem, OutboxEvent, WebhookEvent
 
 admin.site.register(Order)
 admin.site.register(OrderItem)
+admin.site.register(WebhookEvent)
+admin.site.register(OutboxEvent)
@@ -0,0 +1,76 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .models import Order
+from .paypal import get_paypal_client
+from .reservations import release_order
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.CHECKOUT_WORKERS,
+                    thread_name_prefix='checkout',
+                )
+    return _executor
+
+
+def create_paypal_order(order, paypal_items):
+    """Create the PayPal order for a local order and store its id."""
+    paypal_order = get_paypal_client().create_order(
+        amount=order.total_amount,
+        items=paypal_items,
+        order_id=order.id
+    )
+    order.paypal_order_id = paypal_order['id']
+    order.paypal_payment_status = paypal_order['status']
+    order.save(update_fields=['paypal_order_id', 'paypal_payment_status', 'updated_at'])
+    return paypal_order
+
+
+def _run_create_paypal_order(order_id, paypal_items):
+    close_old_connections()
+    try:
+        order = Order.objects.get(pk=order_id)
+        create_paypal_order(order, paypal_items)
+    except Exception:
+        logger.exception("Async PayPal order creation failed for order %s", order_id)
+        release_order(Order(pk=order_id), status='failed')
+    finally:
+        close_old_connections()
+
+
+def enqueue_paypal_order(order, paypal_items):
+    """
+    Create the PayPal order on the checkout worker pool instead of the
+    request thread. The job is only queued once the surrounding transaction
+    commits, so the worker always sees the order row.
+    """
+    transaction.on_commit(
+        lambda: _get_executor().submit(_run_create_paypal_order, order.id, paypal_items)
+    )
+
+
+def checkout_status(order):
+    """Polling payload for an order whose PayPal order may still be in flight."""
+    if order.status == 'failed':
+        return {'order': order.id, 'status': 'failed'}
+    if not order.paypal_order_id:
+        return {'order': order.id, 'status': 'processing'}
+    return {
+        'order': order.id,
+        'id': order.paypal_order_id,
+        'status': order.paypal_payment_status,
+    }
@@ -0,0 +1,110 @@
+"""
+Minimal in-memory stand-in for the PayPal REST endpoints the store uses.
+
+Point PAYPAL_BASE_URL at it (``python manage.py fake_paypal``) to exercise
+checkout locally or under load without touching the sandbox.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import threading
+import time
+
+
+class FakePayPalState:
+    def __init__(self, latency=0.0, auto_approve=True):
+        self.latency = latency
+        self.auto_approve = auto_approve
+        self.orders = {}
+        self.captured_request_ids = {}
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def next_id(self):
+        return f"FAKE{next(self._ids):012d}"
+
+
+class FakePayPalHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        try:
+            return json.loads(body) if body else {}
+        except ValueError:
+            return {}
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay(self):
+        if self.state.latency:
+            time.sleep(self.state.latency)
+
+    def do_POST(self):
+        self._delay()
+        if self.path == '/v1/oauth2/token':
+            self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            return self._send(200, {
+                'access_token': 'fake-token',
+                'token_type': 'Bearer',
+                'expires_in': 32400,
+            })
+
+        if self.path == '/v2/checkout/orders':
+            payload = self._read_json()
+            with self.state.lock:
+                order_id = self.state.next_id()
+                order = {
+                    'id': order_id,
+                    'status': 'APPROVED' if self.state.auto_approve else 'CREATED',
+                    'purchase_units': payload.get('purchase_units', []),
+                }
+                self.state.orders[order_id] = order
+            return self._send(201, order)
+
+        if self.path.startswith('/v2/checkout/orders/') and self.path.endswith('/capture'):
+            self._read_json()
+            order_id = self.path.split('/')[4]
+            request_id = self.headers.get('PayPal-Request-Id')
+            with self.state.lock:
+                order = self.state.orders.get(order_id)
+                if order is None:
+                    return self._send(404, {'name': 'RESOURCE_NOT_FOUND', 'details': [{'issue': 'INVALID_RESOURCE_ID'}]})
+                if request_id and request_id in self.state.captured_request_ids:
+                    return self._send(200, self.state.captured_request_ids[request_id])
+                if order['status'] == 'COMPLETED':
+                    return self._send(422, {'name': 'UNPROCESSABLE_ENTITY', 'details': [{'issue': 'ORDER_ALREADY_CAPTURED'}]})
+                order['status'] = 'COMPLETED'
+                if request_id:
+                    self.state.captured_request_ids[request_id] = order
+            return self._send(201, order)
+
+        self._send(404, {'name': 'NOT_FOUND'})
+
+    def do_GET(self):
+        self._delay()
+        if self.path.startswith('/v2/checkout/orders/'):
+            order = self.state.orders.get(self.path.split('/')[4])
+            if order is None:
+                return self._send(404, {'name': 'RESOURCE_NOT_FOUND', 'details': [{'issue': 'INVALID_RESOURCE_ID'}]})
+            return self._send(200, order)
+        self._send(404, {'name': 'NOT_FOUND'})
+
+
+def make_server(host='127.0.0.1', port=0, latency=0.0, auto_approve=True):
+    """Build a threaded fake PayPal server; port 0 picks a free port."""
+    handler = type('Handler', (FakePayPalHandler,), {
+        'state': FakePayPalState(latency=latency, auto_approve=auto_approve),
+    })
+    return ThreadingHTTPServer((host, port), handler)
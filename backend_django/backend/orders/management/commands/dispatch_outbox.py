@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from orders.outbox import dispatch_batch
+
+
+class Command(BaseCommand):
+    help = "Deliver queued order events to the notification sinks with a pool of worker threads"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help="Worker threads; use 1 on SQLite, which has no row-level locking"
+        )
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help="Keep polling for due events instead of exiting once none are left"
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help="Seconds to wait between polls when nothing is due with --loop"
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        def work():
+            claimed_total = 0
+            try:
+                while True:
+                    claimed = dispatch_batch(batch_size)
+                    claimed_total += claimed
+                    if claimed:
+                        continue
+                    if not options['loop']:
+                        return claimed_total
+                    time.sleep(options['interval'])
+            finally:
+                close_old_connections()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            futures = [pool.submit(work) for _ in range(options['workers'])]
+            claimed = sum(future.result() for future in futures)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"Dispatched {claimed} event(s) in {elapsed:.2f}s")
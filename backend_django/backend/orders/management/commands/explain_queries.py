@@ -0,0 +1,95 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from orders.models import Order
+from store.models import CartItem, Product
+from store.search import search_products
+
+# Full table scans as reported by each backend's query plan
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (\w+)(?!.*\bUSING\b)'),
+}
+
+
+def _sample_ids():
+    # Real ids from the dataset, so the planner sees representative values
+    order = Order.objects.exclude(paypal_order_id=None).order_by('-id').first()
+    order = order or Order.objects.order_by('-id').first()
+    product = Product.objects.order_by('-id').first()
+    return {
+        'user_id': order.user_id if order else 0,
+        'order_id': order.id if order else 0,
+        'paypal_order_id': (order.paypal_order_id if order else None) or 'missing',
+        'product_id': product.id if product else 0,
+    }
+
+
+def endpoint_queries(ids):
+    """The ORM queries behind each API endpoint, keyed by a descriptive name."""
+    active = Product.objects.filter(status='active')
+    user_orders = Order.objects.filter(user_id=ids['user_id'])
+    return {
+        'GET /api/products/': active.order_by('-created_at', '-id')[:25],
+        'GET /api/products/{id}/': active.filter(pk=ids['product_id']),
+        'GET /api/products/search/ (q)': search_products(active, 'shirt').order_by('-created_at', '-id')[:25],
+        'GET /api/products/search/ (price)': search_products(
+            active, min_price=10, max_price=12
+        ).order_by('-created_at', '-id')[:25],
+        'GET /api/cart/': CartItem.objects.filter(user_id=ids['user_id']).select_related('product'),
+        'GET /api/orders/': user_orders.order_by('-created_at', '-id')[:21],
+        'GET /api/orders/{id}/': user_orders.filter(pk=ids['order_id']),
+        'POST /api/orders/verify-payment/': user_orders.filter(paypal_order_id=ids['paypal_order_id']),
+        'POST /api/webhooks/stripe/': Order.objects.filter(pk=ids['order_id']),
+        'release_expired_reservations': Order.objects.filter(
+            status='pending', reserved_until__lt=timezone.now()
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN on the ORM queries behind each API endpoint and fail if any "
+        "of them falls back to a sequential scan. Run it against a seeded, "
+        "production-sized database; on small tables the planner rightly prefers "
+        "sequential scans."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help="Use EXPLAIN ANALYZE (PostgreSQL) to execute the queries too"
+        )
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help="Print the full plan for every query"
+        )
+
+    def handle(self, *args, **options):
+        pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f"Unsupported database backend: {connection.vendor}")
+
+        explain_options = {}
+        if options['analyze'] and connection.vendor == 'postgresql':
+            explain_options['analyze'] = True
+
+        failures = []
+        for name, queryset in endpoint_queries(_sample_ids()).items():
+            plan = queryset.explain(**explain_options)
+            scanned = sorted(set(pattern.findall(plan)))
+            if scanned:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(
+                    f"SEQ SCAN  {name}: {', '.join(scanned)}"
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"ok        {name}"))
+            if options['verbose_plans'] or scanned:
+                self.stdout.write(plan + '\n')
+
+        if failures:
+            raise CommandError(f"{len(failures)} endpoint queries use a sequential scan")
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from orders.fake_paypal import make_server
+
+
+class Command(BaseCommand):
+    help = "Run a local fake PayPal API server for checkout development and load tests"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument(
+            '--latency', type=float, default=0.0,
+            help="Seconds to sleep before answering each request"
+        )
+        parser.add_argument(
+            '--manual-approve', action='store_true',
+            help="Leave new orders in CREATED instead of APPROVED"
+        )
+
+    def handle(self, *args, **options):
+        server = make_server(
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency'],
+            auto_approve=not options['manual_approve'],
+        )
+        host, port = server.server_address[:2]
+        self.stdout.write(f"Fake PayPal listening on http://{host}:{port}")
+        self.stdout.write(f"Set PAYPAL_BASE_URL=http://{host}:{port} to use it")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from orders.webhook_events import process_batch
+
+
+class Command(BaseCommand):
+    help = "Drain stored payment webhook events with a pool of worker threads"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help="Worker threads; use 1 on SQLite, which has no row-level locking"
+        )
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help="Keep polling for new events instead of exiting once the queue is empty"
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help="Seconds to wait between polls of an empty queue with --loop"
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        def work():
+            processed = 0
+            try:
+                while True:
+                    claimed = process_batch(batch_size)
+                    processed += claimed
+                    if claimed:
+                        continue
+                    if not options['loop']:
+                        return processed
+                    time.sleep(options['interval'])
+            finally:
+                close_old_connections()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            futures = [pool.submit(work) for _ in range(options['workers'])]
+            processed = sum(future.result() for future in futures)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"Processed {processed} event(s) in {elapsed:.2f}s")
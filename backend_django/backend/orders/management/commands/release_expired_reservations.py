@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from orders.reservations import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = "Cancel pending orders whose inventory reservation has expired and restock their items"
+
+    def handle(self, *args, **options):
+        released = release_expired_reservations()
+        self.stdout.write(f"Released {released} expired reservation(s)")
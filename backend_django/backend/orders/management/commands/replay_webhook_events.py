@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from orders.models import WebhookEvent
+
+
+class Command(BaseCommand):
+    help = "Queue stored webhook events to be processed again"
+
+    def add_arguments(self, parser):
+        parser.add_argument('event_ids', nargs='*', help="Provider event ids to replay")
+        parser.add_argument('--provider', default='stripe')
+        parser.add_argument(
+            '--status', choices=['failed', 'processed'],
+            help="Replay every event currently in this status"
+        )
+        parser.add_argument('--type', dest='event_type', help="Only events of this type")
+        parser.add_argument('--since', help="Only events received at or after this ISO datetime")
+
+    def handle(self, *args, **options):
+        if not options['event_ids'] and not options['status']:
+            raise CommandError("Give event ids or --status")
+
+        events = WebhookEvent.objects.filter(provider=options['provider'])
+        if options['event_ids']:
+            events = events.filter(event_id__in=options['event_ids'])
+        if options['status']:
+            events = events.filter(status=options['status'])
+        if options['event_type']:
+            events = events.filter(event_type=options['event_type'])
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError("--since must be an ISO datetime")
+            events = events.filter(received_at__gte=since)
+
+        replayed = events.update(
+            status='pending', attempts=0, last_error='', processed_at=None,
+            next_attempt_at=timezone.now(),
+        )
+        self.stdout.write(f"Queued {replayed} event(s) for replay; run process_webhook_events to handle them")
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:24
+
+from django.db import migrations, models
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_paypal_order_id_order_paypal_payment_data_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='reserved_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:31
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class AddIndexConcurrentlyOnPostgreSQL(AddIndexConcurrently):
+    """
+    orders_order is written on every checkout, so on PostgreSQL the index is
+    built with CREATE INDEX CONCURRENTLY instead of blocking writes. Other
+    backends (SQLite for local development and tests) get a plain index.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class AddUniqueConstraintConcurrently(migrations.AddConstraint):
+    """
+    A conditional UniqueConstraint is a partial unique index on PostgreSQL.
+    Build that index CONCURRENTLY under the constraint's name, and the
+    constraint is then attached through the migration state alone. Django
+    manages it (RemoveConstraint and so on) like any other constraint
+    afterwards.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            sql = str(self.constraint.create_sql(model, schema_editor))
+            schema_editor.execute(
+                sql.replace('CREATE UNIQUE INDEX', 'CREATE UNIQUE INDEX CONCURRENTLY', 1),
+                params=None,
+            )
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('orders', '0006_order_failed_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyOnPostgreSQL(
+            model_name='order',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='orders_user_recent_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgreSQL(
+            model_name='order',
+            index=models.Index(condition=models.Q(('stripe_payment_intent_id__isnull', False)), fields=['stripe_payment_intent_id'], name='orders_stripe_intent_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgreSQL(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['reserved_until'], name='orders_pending_reserved_idx'),
+        ),
+        AddUniqueConstraintConcurrently(
+            model_name='order',
+            constraint=models.UniqueConstraint(condition=models.Q(('paypal_order_id__isnull', False)), fields=('paypal_order_id',), name='orders_unique_paypal_order_id'),
+        ),
+    ]
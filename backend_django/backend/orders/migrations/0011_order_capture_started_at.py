@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_webhookevent_next_attempt_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='capture_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from store.models import Product
 
@@ -11,11 +13,21 @@ class Order(models.Model):
         ('shipped', 'Shipped'),
         ('delivered', 'Delivered'),
         ('cancelled', 'Cancelled'),
+        ('failed', 'Failed'),
     ]
-    
-    paypal_payment_id = models.CharField(max_length=255, blank=True)
-    paypal_payer_id = models.CharField(max_length=255, blank=True)
-    paypal_payment_status = models.CharField(max_length=50, blank=True)
+
+    # Allowed status changes; anything not listed here is rejected
+    TRANSITIONS = {
+        'pending': {'paid', 'cancelled', 'failed'},
+        'paid': {'shipped', 'cancelled'},
+        'shipped': {'delivered'},
+        'delivered': set(),
+        'cancelled': set(),
+        'failed': set(),
+    }
+    # Statuses in which the payment is settled and PayPal need not be asked again
+    PAYMENT_FINAL_STATUSES = {'paid', 'shipped', 'delivered', 'cancelled', 'failed'}
+
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
@@ -27,10 +39,58 @@ class Order(models.Model):
     paypal_payment_id = models.CharField(max_length=255, blank=True, null=True)
     paypal_payment_status = models.CharField(max_length=50, blank=True, null=True)
     paypal_payment_data = models.JSONField(blank=True, null=True)
+    # Stock for the items is held until this time while the order is pending
+    reserved_until = models.DateTimeField(blank=True, null=True)
+    # Set while a PayPal capture is in flight; the order cannot be released then
+    capture_started_at = models.DateTimeField(blank=True, null=True)
 
     def __str__(self):
         return f"Order #{self.id} - {self.user.email}"
 
+    class Meta:
+        indexes = [
+            # Order history: one user's orders, newest first (matches
+            # OrderCursorPagination's ordering)
+            models.Index(fields=['user', '-created_at', '-id'], name='orders_user_recent_idx'),
+            models.Index(
+                fields=['stripe_payment_intent_id'],
+                condition=models.Q(stripe_payment_intent_id__isnull=False),
+                name='orders_stripe_intent_idx',
+            ),
+            # Expired reservation sweep only ever looks at pending orders
+            models.Index(
+                fields=['reserved_until'],
+                condition=models.Q(status='pending'),
+                name='orders_pending_reserved_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['paypal_order_id'],
+                condition=models.Q(paypal_order_id__isnull=False),
+                name='orders_unique_paypal_order_id',
+            ),
+        ]
+
+    @property
+    def is_payment_final(self):
+        return self.status in self.PAYMENT_FINAL_STATUSES
+
+    @property
+    def is_capturing(self):
+        return self.capture_started_at is not None and (
+            timezone.now() - self.capture_started_at
+        ).total_seconds() < settings.PAYPAL_CAPTURE_CLAIM_SECONDS
+
+    def transition_to(self, status):
+        if status not in self.TRANSITIONS[self.status]:
+            raise InvalidTransition(f"Cannot move order from {self.status} to {status}")
+        self.status = status
+
+
+class InvalidTransition(Exception):
+    pass
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, related_name='items', on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
@@ -39,3 +99,79 @@ class OrderItem(models.Model):
     
     def __str__(self):
         return f"{self.quantity} x {self.product.name} @ {self.unit_price}"
+
+class WebhookEvent(models.Model):
+    """A payment provider webhook, stored as received and processed later."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('failed', 'Failed'),
+    ]
+
+    provider = models.CharField(max_length=20, default='stripe')
+    event_id = models.CharField(max_length=255)
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Failed events are retried with backoff, not on the very next batch
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            # Providers redeliver events; the event id deduplicates them
+            models.UniqueConstraint(fields=['provider', 'event_id'], name='orders_webhook_event_unique'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['id'],
+                condition=models.Q(status='pending'),
+                name='orders_webhook_pending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} {self.event_type} {self.event_id}"
+
+
+class OutboxEvent(models.Model):
+    """
+    An order event waiting to be sent to the notification sinks. Rows are
+    written in the same transaction as the change they describe, so a
+    notification goes out if and only if that change committed.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    event_type = models.CharField(max_length=50)
+    order = models.ForeignKey(
+        Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='outbox_events'
+    )
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    # Sinks that already accepted the event, so a retry skips them
+    delivered_to = models.JSONField(default=list, blank=True)
+    last_error = models.TextField(blank=True)
+    # While a dispatcher holds the event, the end of its lease
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at', 'id'],
+                condition=models.Q(status='pending'),
+                name='orders_outbox_pending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} (order {self.order_id})"
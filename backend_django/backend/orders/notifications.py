@@ -0,0 +1,144 @@
+"""
+Notification sinks for outbox events.
+
+A sink has a ``name``, ``handles(event_type)`` and ``send(event)``, which
+raises to have the event retried. ``open()`` and ``close()`` bracket each
+dispatch batch. OUTBOX_SINKS lists the enabled sinks by name.
+"""
+from collections import deque
+import logging
+import threading
+
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMessage, get_connection
+
+logger = logging.getLogger(__name__)
+
+SUBJECTS = {
+    'order.created': "We received your order #{order_id}",
+    'order.paid': "Payment confirmed for order #{order_id}",
+    'order.cancelled': "Your order #{order_id} was cancelled",
+    'order.failed': "We could not complete order #{order_id}",
+}
+
+
+def describe(event):
+    payload = event.payload
+    return (
+        f"Order #{payload['order_id']}: {event.event_type.split('.', 1)[1]} "
+        f"(${payload['total_amount']}, user {payload['user_id']})"
+    )
+
+
+class Sink:
+    name = None
+
+    def handles(self, event_type):
+        return True
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send(self, event):
+        raise NotImplementedError
+
+
+class StubSink(Sink):
+    """Logs events and keeps the most recent ones in memory; for development and tests."""
+    name = 'stub'
+
+    def __init__(self):
+        self.sent = deque(maxlen=1000)
+
+    def send(self, event):
+        logger.info("Outbox: %s", describe(event))
+        self.sent.append((event.event_type, event.payload))
+
+
+class SlackSink(Sink):
+    """Posts every order event to SLACK_CHANNEL_ID."""
+    name = 'slack'
+    url = 'https://slack.com/api/chat.postMessage'
+
+    def __init__(self):
+        self.session = requests.Session()
+
+    def send(self, event):
+        response = self.session.post(
+            self.url,
+            headers={'Authorization': f"Bearer {settings.SLACK_BOT_TOKEN}"},
+            json={'channel': settings.SLACK_CHANNEL_ID, 'text': describe(event)},
+            timeout=10,
+        )
+        response.raise_for_status()
+        data = response.json()
+        if not data.get('ok'):
+            raise RuntimeError(f"Slack error: {data.get('error')}")
+
+
+class EmailSink(Sink):
+    """Emails the customer about their order; one mail connection per batch."""
+    name = 'email'
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def handles(self, event_type):
+        return event_type in SUBJECTS
+
+    def open(self):
+        # Connects on the first send, so a batch without emails, or an SMTP
+        # outage, does not hold up the other sinks
+        self._local.connection = get_connection()
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def send(self, event):
+        email = (
+            get_user_model().objects
+            .filter(pk=event.payload['user_id'])
+            .values_list('email', flat=True)
+            .first()
+        )
+        if not email:
+            return
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            # An unopened backend connects and disconnects on every send
+            connection.open()
+        message = EmailMessage(
+            subject=SUBJECTS[event.event_type].format(**event.payload),
+            body=describe(event),
+            to=[email],
+            connection=connection,
+        )
+        message.send()
+
+
+SINK_CLASSES = {
+    'stub': StubSink,
+    'slack': SlackSink,
+    'email': EmailSink,
+}
+
+_sinks = None
+_sinks_lock = threading.Lock()
+
+
+def get_sinks():
+    """Return the process-wide sink instances named in OUTBOX_SINKS."""
+    global _sinks
+    if _sinks is None:
+        with _sinks_lock:
+            if _sinks is None:
+                _sinks = [SINK_CLASSES[name]() for name in settings.OUTBOX_SINKS]
+    return _sinks
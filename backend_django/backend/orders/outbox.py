@@ -0,0 +1,147 @@
+"""
+Transactional outbox for order events.
+
+State changes call record_order_event() inside their own transaction. The
+dispatch_outbox command later hands committed events to the configured
+notification sinks (orders/notifications.py), so Slack or SMTP latency and
+outages never reach the checkout or payment response. Failed deliveries are
+retried with exponential backoff and jitter.
+
+A dispatcher claims a batch in one short transaction by pushing the events'
+next_attempt_at forward by OUTBOX_LEASE_SECONDS, then calls the sinks with
+no transaction or row lock held. Each event's result is saved as soon as
+it is delivered, so a crash re-sends at most the event in flight. Events
+the crashed dispatcher had not reached become due again when the lease
+runs out.
+"""
+from contextlib import contextmanager
+from datetime import timedelta
+import logging
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEvent
+from .notifications import get_sinks
+
+logger = logging.getLogger(__name__)
+
+
+def record_order_event(order, event_type):
+    """Queue ``event_type`` for ``order``; call inside the transaction that changed it."""
+    return OutboxEvent.objects.create(
+        event_type=event_type,
+        order=order,
+        payload={
+            'order_id': order.pk,
+            'user_id': order.user_id,
+            'status': order.status,
+            'total_amount': f"{order.total_amount:.2f}",
+            'paypal_order_id': order.paypal_order_id,
+        },
+    )
+
+
+def retry_delay(attempts, base=None, cap=None):
+    """
+    Exponential backoff with jitter from ``base`` seconds, capped at ``cap``
+    (by default OUTBOX_BACKOFF_SECONDS and OUTBOX_MAX_BACKOFF_SECONDS).
+    """
+    base = settings.OUTBOX_BACKOFF_SECONDS if base is None else base
+    cap = settings.OUTBOX_MAX_BACKOFF_SECONDS if cap is None else cap
+    ceiling = min(cap, base * 2 ** (attempts - 1))
+    return timedelta(seconds=random.uniform(ceiling / 2, ceiling))
+
+
+def deliver(event, sinks):
+    """Send ``event`` to every sink that has not taken it yet; raises on the first failure."""
+    for sink in sinks:
+        if sink.name in event.delivered_to or not sink.handles(event.event_type):
+            continue
+        sink.send(event)
+        event.delivered_to.append(sink.name)
+
+
+@contextmanager
+def _sink_batches(sinks):
+    for sink in sinks:
+        sink.open()
+    try:
+        yield
+    finally:
+        for sink in sinks:
+            sink.close()
+
+
+def claim_batch(batch_size):
+    """
+    Lease up to ``batch_size`` due events to the caller; returns them and
+    the lease's expiry.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        lease_until = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+            next_attempt_at=lease_until
+        )
+    return events, lease_until
+
+
+def _save_result(event, lease_until):
+    # Skipped if the lease ran out mid-send and another dispatcher took over
+    OutboxEvent.objects.filter(pk=event.pk, next_attempt_at=lease_until).update(
+        status=event.status,
+        attempts=event.attempts,
+        delivered_to=event.delivered_to,
+        last_error=event.last_error,
+        next_attempt_at=event.next_attempt_at,
+        sent_at=event.sent_at,
+    )
+
+
+def dispatch_batch(batch_size=100):
+    """
+    Deliver up to ``batch_size`` due events; returns how many were claimed.
+
+    Rows are claimed with SKIP LOCKED, so several dispatchers can run side
+    by side. Each sink is opened once before the batch and closed after it
+    (see _sink_batches), so it can reuse e.g. one SMTP connection. Events
+    not reached before the lease runs out are handed back undelivered.
+    """
+    events, lease_until = claim_batch(batch_size)
+    if not events:
+        return 0
+
+    sinks = get_sinks()
+    with _sink_batches(sinks):
+        for index, event in enumerate(events):
+            now = timezone.now()
+            if now >= lease_until:
+                OutboxEvent.objects.filter(
+                    pk__in=[unsent.pk for unsent in events[index:]],
+                    next_attempt_at=lease_until,
+                ).update(next_attempt_at=now)
+                break
+            event.attempts += 1
+            try:
+                deliver(event, sinks)
+            except Exception as e:
+                logger.warning("Outbox event %s failed: %s", event.pk, e)
+                event.last_error = str(e)
+                if event.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                    event.status = 'failed'
+                else:
+                    event.next_attempt_at = now + retry_delay(event.attempts)
+            else:
+                event.status = 'sent'
+                event.sent_at = timezone.now()
+                event.last_error = ''
+            _save_result(event, lease_until)
+    return len(events)
@@ -0,0 +1,133 @@
+from contextlib import contextmanager
+from datetime import timedelta
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Order
+from .outbox import record_order_event
+from .paypal import get_paypal_client
+
+logger = logging.getLogger(__name__)
+
+
+class _KeyedLocks:
+    """Per-key locks that are dropped again once nobody holds or waits on them."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks = {}
+
+    @contextmanager
+    def hold(self, key):
+        with self._lock:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = self._locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+
+_verify_locks = _KeyedLocks()
+
+
+def capture_request_id(order):
+    # Stable per order, so a retried capture is deduplicated by PayPal
+    return f"capture-{order.paypal_order_id}"
+
+
+def claim_capture(order):
+    """
+    Mark a pending order as being captured; returns False if it is no
+    longer pending or another capture holds it.
+
+    A conditional UPDATE, so it cannot interleave with release_order(),
+    which leaves claimed orders alone for PAYPAL_CAPTURE_CLAIM_SECONDS.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.PAYPAL_CAPTURE_CLAIM_SECONDS)
+    return bool(
+        Order.objects.filter(pk=order.pk, status='pending')
+        .filter(Q(capture_started_at__isnull=True) | Q(capture_started_at__lt=stale))
+        .update(capture_started_at=now)
+    )
+
+
+def verify_order_payment(order):
+    """
+    Bring a pending order up to date with its PayPal payment.
+
+    PayPal is called with no transaction or row lock open, so a slow PayPal
+    never holds up cancel, the expiry sweep or webhook processing for the
+    order. Before capturing, the order is claimed with claim_capture(), so
+    an order that was cancelled or expired (and restocked) is never
+    charged, and one being charged cannot be cancelled. Concurrent
+    verifications of the same PayPal order are coalesced by an in-process
+    lock: whoever goes next re-reads the order and returns without calling
+    PayPal if it is already settled. Across processes a repeated capture
+    is deduplicated by PayPal through PayPal-Request-Id. The result is then
+    applied under a brief row lock, unless the order left 'pending' in the
+    meantime.
+    """
+    with _verify_locks.hold(order.paypal_order_id):
+        order = Order.objects.get(pk=order.pk)
+        if order.is_payment_final:
+            return order
+
+        paypal = get_paypal_client()
+        paypal_order = paypal.get_order_status(order.paypal_order_id)
+        if paypal_order['status'] == 'APPROVED':
+            if not claim_capture(order):
+                # Released meanwhile, or being captured by another process
+                return Order.objects.get(pk=order.pk)
+            try:
+                paypal_order = paypal.capture_order(
+                    order.paypal_order_id,
+                    request_id=capture_request_id(order)
+                )
+            except Exception:
+                Order.objects.filter(pk=order.pk).update(capture_started_at=None)
+                raise
+
+        with transaction.atomic():
+            order = Order.objects.select_for_update().get(pk=order.pk)
+            order.capture_started_at = None
+            if order.is_payment_final:
+                # Only possible once a claim outlived PAYPAL_CAPTURE_CLAIM_SECONDS
+                if paypal_order['status'] == 'COMPLETED' and order.status in ('cancelled', 'failed'):
+                    logger.error(
+                        "PayPal order %s was paid but order %s is %s; refund or restore it",
+                        order.paypal_order_id, order.pk, order.status
+                    )
+                return order
+
+            order.paypal_payment_status = paypal_order['status']
+            if paypal_order['status'] == 'COMPLETED':
+                _mark_paid(order, paypal_order)
+            order.save()
+            if order.status == 'paid':
+                record_order_event(order, 'order.paid')
+        return order
+
+
+def _mark_paid(order, paypal_order):
+    order.transition_to('paid')
+    order.reserved_until = None
+    order.paypal_payment_data = paypal_order
+    payer = paypal_order.get('payer') or {}
+    if payer.get('payer_id'):
+        order.paypal_payer_id = payer['payer_id']
+    for unit in paypal_order.get('purchase_units', []):
+        for capture in (unit.get('payments') or {}).get('captures', []):
+            order.paypal_payment_id = capture['id']
@@ -1,70 +1,184 @@
 # orders/paypal.py
+import logging
+import threading
+import time
+
 import requests
-import base64
+from requests.adapters import HTTPAdapter
 from django.conf import settings
 
+from backend.metrics import record_outbound
+
+logger = logging.getLogger(__name__)
+
+# Refresh the access token this many seconds before PayPal expires it
+TOKEN_EXPIRY_MARGIN = 60
+
+
 class PayPalClient:
-    def __init__(self):
-        self.base_url = (
-            "https://api.sandbox.paypal.com" 
-            if settings.PAYPAL_MODE == "sandbox" 
+    """
+    PayPal REST client meant to be shared by the whole process.
+
+    Keeps one requests.Session so connections to PayPal are pooled and
+    kept alive, and caches the OAuth access token until shortly before it
+    expires instead of fetching a new one for every call.
+    """
+
+    def __init__(self, base_url=None, pool_size=10, timeout=15):
+        self.base_url = base_url or (
+            "https://api.sandbox.paypal.com"
+            if settings.PAYPAL_MODE == "sandbox"
             else "https://api.paypal.com"
         )
-        self.auth_token = self._get_auth_token()
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._token = None
+        self._token_expires_at = 0
+        self._token_lock = threading.Lock()
+
+    @property
+    def auth_token(self):
+        if self._token and time.monotonic() < self._token_expires_at:
+            return self._token
+
+        with self._token_lock:
+            # Another thread may have refreshed while we waited for the lock
+            if self._token and time.monotonic() < self._token_expires_at:
+                return self._token
+            self._token, expires_in = self._get_auth_token()
+            self._token_expires_at = (
+                time.monotonic() + max(expires_in - TOKEN_EXPIRY_MARGIN, 0)
+            )
+            return self._token
 
     def _get_auth_token(self):
-        auth = base64.b64encode(
-            f"{settings.PAYPAL_CLIENT_ID}:{settings.PAYPAL_CLIENT_SECRET}".encode()
-        ).decode()
-        
-        headers = {
-            "Authorization": f"Basic {auth}",
-            "Content-Type": "application/x-www-form-urlencoded"
-        }
-        
-        data = {"grant_type": "client_credentials"}
-        response = requests.post(
+        started = time.perf_counter()
+        response = self.session.post(
             f"{self.base_url}/v1/oauth2/token",
-            headers=headers,
-            data=data
+            auth=(settings.PAYPAL_CLIENT_ID, settings.PAYPAL_CLIENT_SECRET),
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            data={"grant_type": "client_credentials"},
+            timeout=self.timeout,
         )
-        return response.json()["access_token"]
+        record_outbound("paypal", "oauth_token", time.perf_counter() - started)
+        response.raise_for_status()
+        data = response.json()
+        return data["access_token"], int(data.get("expires_in", 0))
+
+    def invalidate_token(self):
+        with self._token_lock:
+            self._token = None
+            self._token_expires_at = 0
 
-    def create_order(self, amount, currency="USD"):
-        headers = {
+    def _request(self, operation, method, path, headers=None, **kwargs):
+        started = time.perf_counter()
+        request_headers = {
             "Authorization": f"Bearer {self.auth_token}",
-            "Content-Type": "application/json"
+            "Content-Type": "application/json",
         }
-        
+        request_headers.update(headers or {})
+        response = self.session.request(
+            method,
+            f"{self.base_url}{path}",
+            headers=request_headers,
+            timeout=self.timeout,
+            **kwargs
+        )
+
+        # Token revoked or expired early on PayPal's side: refresh once and retry
+        if response.status_code == 401:
+            self.invalidate_token()
+            request_headers["Authorization"] = f"Bearer {self.auth_token}"
+            response = self.session.request(
+                method,
+                f"{self.base_url}{path}",
+                headers=request_headers,
+                timeout=self.timeout,
+                **kwargs
+            )
+
+        record_outbound("paypal", operation, time.perf_counter() - started)
+        response.raise_for_status()
+        return response.json()
+
+    def create_order(self, amount, currency="USD", items=None, order_id=None):
         payload = {
             "intent": "CAPTURE",
             "purchase_units": [{
+                "reference_id": str(order_id),
                 "amount": {
                     "currency_code": currency,
-                    "value": f"{amount:.2f}"
-                }
+                    "value": f"{amount:.2f}",
+                    "breakdown": {
+                        "item_total": {
+                            "currency_code": currency,
+                            "value": f"{amount:.2f}"
+                        }
+                    }
+                },
+                "items": items or []
             }],
             "application_context": {
+                "brand_name": settings.PAYPAL_BRAND_NAME,
+                "user_action": "PAY_NOW",
                 "return_url": f"{settings.FRONTEND_URL}/order-success",
                 "cancel_url": f"{settings.FRONTEND_URL}/checkout"
             }
         }
-        
-        response = requests.post(
-            f"{self.base_url}/v2/checkout/orders",
+        return self._request(
+            "create_order",
+            "POST",
+            "/v2/checkout/orders",
             json=payload,
-            headers=headers
+            headers={"Prefer": "return=representation"},
         )
-        return response.json()
 
-    def capture_order(self, order_id):
-        headers = {
-            "Authorization": f"Bearer {self.auth_token}",
-            "Content-Type": "application/json"
-        }
-        
-        response = requests.post(
-            f"{self.base_url}/v2/checkout/orders/{order_id}/capture",
-            headers=headers
-        )
-        return response.json()
\ No newline at end of file
+    def get_order_status(self, order_id):
+        return self._request("get_order_status", "GET", f"/v2/checkout/orders/{order_id}")
+
+    def capture_order(self, order_id, request_id=None):
+        headers = {"Prefer": "return=representation"}
+        if request_id:
+            # Idempotency key: PayPal replays the original result for a repeat
+            headers["PayPal-Request-Id"] = request_id
+        try:
+            return self._request(
+                "capture_order",
+                "POST",
+                f"/v2/checkout/orders/{order_id}/capture",
+                headers=headers,
+            )
+        except requests.exceptions.HTTPError as err:
+            try:
+                error_detail = err.response.json()
+            except ValueError:
+                error_detail = None
+            if not isinstance(error_detail, dict):
+                error_detail = {}
+            logger.warning(
+                "PayPal capture of %s failed with HTTP %s: %s",
+                order_id, err.response.status_code, error_detail or err.response.text[:500]
+            )
+            issue = (error_detail.get('details') or [{}])[0].get('issue')
+            raise ValueError(issue or 'Capture failed')
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_paypal_client():
+    """Return the process-wide PayPalClient, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PayPalClient(base_url=settings.PAYPAL_BASE_URL or None)
+    return _client
@@ -0,0 +1,85 @@
+from collections import Counter
+from datetime import timedelta
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from store.inventory import release_stock, reserve_stock
+
+from .models import Order
+from .outbox import record_order_event
+from .payments import verify_order_payment
+
+logger = logging.getLogger(__name__)
+
+
+def reservation_deadline():
+    return timezone.now() + timedelta(seconds=settings.INVENTORY_RESERVATION_SECONDS)
+
+
+def reserve_order_items(order_items):
+    """Reserve stock for unsaved OrderItems; must run inside the order's transaction."""
+    quantities = Counter()
+    for order_item in order_items:
+        quantities[order_item.product_id] += order_item.quantity
+    reserve_stock(quantities)
+
+
+def release_order(order, status='cancelled'):
+    """
+    Move a pending order to ``status`` and return its reserved stock.
+
+    The order row is locked first, so a cancel racing with the expiry sweep
+    (or a second cancel) releases the stock only once. Returns False if the
+    order was no longer pending, or while its PayPal payment is being
+    captured (see claim_capture()).
+    """
+    with transaction.atomic():
+        locked = Order.objects.select_for_update().get(pk=order.pk)
+        if locked.status != 'pending' or locked.is_capturing:
+            return False
+
+        if locked.reserved_until is not None:
+            quantities = Counter()
+            for product_id, quantity in locked.items.values_list('product_id', 'quantity'):
+                quantities[product_id] += quantity
+            release_stock(quantities)
+
+        locked.transition_to(status)
+        locked.reserved_until = None
+        locked.save(update_fields=['status', 'reserved_until', 'updated_at'])
+        record_order_event(locked, f"order.{status}")
+
+    order.status = locked.status
+    order.reserved_until = None
+    return True
+
+
+def release_expired_reservations(now=None):
+    """
+    Cancel pending orders whose reservation has lapsed; returns how many.
+
+    The frontend captures PayPal payments itself, so an order with a PayPal
+    order may have been paid with the verify call lost. Such orders are
+    checked with PayPal first and settled rather than cancelled if the
+    payment went through. If PayPal cannot be reached, or the payment is
+    being captured, the order is left for the next sweep.
+    """
+    expired = Order.objects.filter(
+        status='pending',
+        reserved_until__lt=now or timezone.now(),
+    ).only('pk', 'paypal_order_id')
+    released = 0
+    for order in expired.iterator():
+        if order.paypal_order_id:
+            try:
+                order = verify_order_payment(order)
+            except Exception:
+                logger.exception("Could not check PayPal for expired order %s", order.pk)
+                continue
+            if order.status != 'pending':
+                continue
+        released += release_order(order)
+    return released
@@ -1,9 +1,9 @@
 from rest_framework import serializers
 from .models import Order, OrderItem
-from store.serializers import ProductSerializer
+from store.serializers import ProductReadField
 
 class OrderItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
+    product = ProductReadField()
     
     class Meta:
         model = OrderItem
@@ -1,3 +1,695 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+import requests
+from rest_framework.test import APIClient
+
+from backend.throttling import TokenBucketThrottle
+from store.inventory import InsufficientStock, reserve_stock
+from store.models import Product
+from store.tests import make_product, run_concurrently
+
+from .models import Order, OrderItem, OutboxEvent, WebhookEvent
+from .notifications import EmailSink, Sink
+from .outbox import dispatch_batch, record_order_event
+from .payments import verify_order_payment
+from .paypal import PayPalClient
+from .reservations import release_expired_reservations, release_order, reservation_deadline
+from .webhook_events import process_batch
+
+
+def make_order(user, product, quantity=1, **kwargs):
+    """A pending order holding ``quantity`` of ``product`` (stock already taken)."""
+    kwargs.setdefault('reserved_until', reservation_deadline())
+    order = Order.objects.create(
+        user=user, total_amount=product.price * quantity, status='pending', **kwargs
+    )
+    OrderItem.objects.create(order=order, product=product, quantity=quantity, unit_price=product.price)
+    return order
+
+
+@override_settings(THROTTLE_ENABLED=False, CHECKOUT_ASYNC=False)
+class HotSkuConcurrencyTests(TransactionTestCase):
+    """Many buyers racing for the last units of one product."""
+
+    stock = 5
+    buyers = 12
+
+    def setUp(self):
+        self.product = make_product(inventory_count=self.stock)
+
+    def test_reserve_stock_never_oversells(self):
+        def reserve(index):
+            try:
+                with transaction.atomic():
+                    reserve_stock({self.product.pk: 1})
+                return True
+            except InsufficientStock:
+                return False
+
+        results = run_concurrently(reserve, self.buyers)
+
+        self.assertEqual(results.count(True), self.stock)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.inventory_count, 0)
+
+    @mock.patch('orders.views.create_paypal_order', return_value={'id': 'PAYPAL', 'status': 'CREATED'})
+    def test_checkout_sells_exactly_the_stock(self, create_paypal_order):
+        users = [User.objects.create_user(f'buyer{i}') for i in range(self.buyers)]
+
+        def checkout(index):
+            client = APIClient()
+            client.force_authenticate(users[index])
+            return client.post(
+                '/api/orders/',
+                {'items': [{'product': self.product.pk, 'quantity': 1}]},
+                format='json',
+            ).status_code
+
+        statuses = run_concurrently(checkout, self.buyers)
+
+        self.assertEqual(statuses.count(200), self.stock)
+        self.assertEqual(statuses.count(400), self.buyers - self.stock)
+        self.assertEqual(Order.objects.filter(status='pending').count(), self.stock)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.inventory_count, 0)
+
+    def test_racing_cancels_restock_once(self):
+        user = User.objects.create_user('buyer')
+        order = make_order(user, self.product, quantity=2)
+        Product.objects.filter(pk=self.product.pk).update(inventory_count=self.stock - 2)
+
+        results = run_concurrently(lambda index: release_order(Order(pk=order.pk)), 6)
+
+        self.assertEqual(results.count(True), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.inventory_count, self.stock)
+
+
+@override_settings(THROTTLE_ENABLED=False, CHECKOUT_ASYNC=True)
+class AsyncCheckoutTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('buyer')
+        self.product = make_product(inventory_count=5)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        executor_patcher = mock.patch('orders.checkout._get_executor', return_value=self.executor)
+        executor_patcher.start()
+        self.addCleanup(executor_patcher.stop)
+        paypal_patcher = mock.patch('orders.checkout.get_paypal_client')
+        self.paypal = paypal_patcher.start().return_value
+        self.addCleanup(paypal_patcher.stop)
+
+    def checkout(self):
+        response = self.client.post(
+            '/api/orders/', {'items': [{'product': self.product.pk, 'quantity': 2}]}, format='json'
+        )
+        # Wait for the worker to finish the PayPal call
+        self.executor.shutdown(wait=True)
+        return response
+
+    def checkout_status(self, order_id):
+        return self.client.get(f'/api/orders/{order_id}/checkout-status/').data
+
+    def test_paypal_order_is_created_in_the_background(self):
+        self.paypal.create_order.return_value = {'id': 'PAYPAL-1', 'status': 'CREATED'}
+
+        response = self.checkout()
+
+        self.assertEqual(response.status_code, 202)
+        order_id = response.data['order']
+        self.assertEqual(response.data['status'], 'processing')
+        self.assertEqual(
+            self.checkout_status(order_id), {'order': order_id, 'id': 'PAYPAL-1', 'status': 'CREATED'}
+        )
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.inventory_count, 3)
+
+    def test_paypal_failure_releases_the_order(self):
+        self.paypal.create_order.side_effect = ConnectionError('PayPal unreachable')
+
+        with self.assertLogs('orders.checkout', 'ERROR'):
+            response = self.checkout()
+
+        self.assertEqual(response.status_code, 202)
+        order_id = response.data['order']
+        self.assertEqual(self.checkout_status(order_id), {'order': order_id, 'status': 'failed'})
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.inventory_count, 5)
+
+
+class ReleaseTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('buyer')
+        self.product = make_product(inventory_count=8)
+
+    def test_release_order_restocks_once(self):
+        order = make_order(self.user, self.product, quantity=3)
+
+        self.assertTrue(release_order(order))
+        self.assertFalse(release_order(order))
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.inventory_count, 11)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'cancelled')
+        self.assertIsNone(order.reserved_until)
+
+    def test_expiry_sweep_restocks_once(self):
+        expired = make_order(
+            self.user, self.product, quantity=2,
+            reserved_until=timezone.now() - timedelta(minutes=1),
+        )
+        live = make_order(self.user, self.product, quantity=1)
+
+        self.assertEqual(release_expired_reservations(), 1)
+        self.assertEqual(release_expired_reservations(), 0)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.inventory_count, 10)
+        expired.refresh_from_db()
+        live.refresh_from_db()
+        self.assertEqual(expired.status, 'cancelled')
+        self.assertEqual(live.status, 'pending')
+
+    @mock.patch('orders.payments.get_paypal_client')
+    def test_expiry_sweep_settles_orders_paid_on_paypal(self, get_paypal_client):
+        get_paypal_client.return_value.get_order_status.return_value = {'status': 'COMPLETED'}
+        order = make_order(
+            self.user, self.product, quantity=2, paypal_order_id='PAID-ON-PAYPAL',
+            reserved_until=timezone.now() - timedelta(minutes=1),
+        )
+
+        self.assertEqual(release_expired_reservations(), 0)
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'paid')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.inventory_count, 8)
+
+    @mock.patch('orders.payments.get_paypal_client')
+    def test_expiry_sweep_skips_orders_paypal_cannot_confirm(self, get_paypal_client):
+        get_paypal_client.return_value.get_order_status.side_effect = ConnectionError
+        order = make_order(
+            self.user, self.product, paypal_order_id='UNREACHABLE',
+            reserved_until=timezone.now() - timedelta(minutes=1),
+        )
+
+        with self.assertLogs('orders.reservations', 'ERROR'):
+            self.assertEqual(release_expired_reservations(), 0)
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'pending')
+
+    @mock.patch('orders.payments.get_paypal_client')
+    def test_expiry_sweep_cancels_unpaid_paypal_orders(self, get_paypal_client):
+        get_paypal_client.return_value.get_order_status.return_value = {'status': 'CREATED'}
+        order = make_order(
+            self.user, self.product, quantity=2, paypal_order_id='ABANDONED',
+            reserved_until=timezone.now() - timedelta(minutes=1),
+        )
+
+        self.assertEqual(release_expired_reservations(), 1)
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'cancelled')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.inventory_count, 10)
+
+
+class OrderHistoryQueryCountTests(TestCase):
+    """Order history must not issue queries per order or per item (N+1)."""
+
+    def history_queries(self, orders):
+        user = User.objects.create_user(f'history{orders}')
+        products = [make_product(name=f'Product {i}') for i in range(3)]
+        for _ in range(orders):
+            order = Order.objects.create(user=user, total_amount=Decimal('30.00'))
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, quantity=1, unit_price=product.price)
+                for product in products
+            ])
+        client = APIClient()
+        client.force_authenticate(user)
+        cache.clear()
+        # Orders, their items, and the items' products
+        with self.assertNumQueries(3):
+            response = client.get('/api/orders/', {'page_size': orders})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), orders)
+
+    def test_small_page(self):
+        self.history_queries(3)
+
+    def test_large_page(self):
+        self.history_queries(30)
+
+
+def paypal_response(status_code, body, content_type='application/json'):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = body.encode()
+    response.headers['Content-Type'] = content_type
+    return response
+
+
+class PayPalClientTests(TestCase):
+    def setUp(self):
+        self.paypal = PayPalClient(base_url='https://paypal.invalid')
+        patcher = mock.patch('orders.paypal.time')
+        self.clock = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.clock.monotonic.return_value = 1000.0
+        self.clock.perf_counter.return_value = 0.0
+
+        tokens = iter(['TOKEN-1', 'TOKEN-2', 'TOKEN-3'])
+        self.token_requests = 0
+
+        def post(*args, **kwargs):
+            self.token_requests += 1
+            return paypal_response(200, f'{{"access_token": "{next(tokens)}", "expires_in": 120}}')
+
+        self.responses = []
+        self.sent_headers = []
+
+        def request(method, url, headers, **kwargs):
+            # Copied: the client reuses the dict for its retry
+            self.sent_headers.append(dict(headers))
+            if self.responses:
+                return self.responses.pop(0)
+            return paypal_response(200, '{"status": "APPROVED"}')
+
+        patcher = mock.patch.multiple(self.paypal.session, post=post, request=request)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def authorizations(self):
+        return [headers['Authorization'] for headers in self.sent_headers]
+
+    def test_token_is_reused_until_shortly_before_expiry(self):
+        self.paypal.get_order_status('A')
+        self.clock.monotonic.return_value += 59
+        self.paypal.get_order_status('B')
+        self.clock.monotonic.return_value += 1
+        self.paypal.get_order_status('C')
+
+        self.assertEqual(self.token_requests, 2)
+        self.assertEqual(self.authorizations(), ['Bearer TOKEN-1', 'Bearer TOKEN-1', 'Bearer TOKEN-2'])
+
+    def test_retries_once_with_a_new_token_on_401(self):
+        self.responses = [paypal_response(401, '{}'), paypal_response(200, '{"status": "COMPLETED"}')]
+
+        self.assertEqual(self.paypal.capture_order('A', request_id='capture-A'), {'status': 'COMPLETED'})
+
+        self.assertEqual(self.authorizations(), ['Bearer TOKEN-1', 'Bearer TOKEN-2'])
+        # The retry is the same capture, so PayPal must deduplicate it
+        self.assertEqual([headers['PayPal-Request-Id'] for headers in self.sent_headers], ['capture-A'] * 2)
+
+    def test_gives_up_after_a_second_401(self):
+        self.responses = [paypal_response(401, '{}'), paypal_response(401, '{}')]
+
+        with self.assertRaises(requests.HTTPError):
+            self.paypal.get_order_status('A')
+
+        self.assertEqual(len(self.sent_headers), 2)
+
+    def test_capture_without_request_id_sends_no_header(self):
+        self.paypal.capture_order('A')
+
+        self.assertNotIn('PayPal-Request-Id', self.sent_headers[0])
+
+
+class PayPalCaptureErrorTests(TestCase):
+    def capture_failing_with(self, status_code, body, content_type):
+        response = paypal_response(status_code, body, content_type)
+        client = PayPalClient(base_url='https://paypal.invalid')
+        with mock.patch.object(PayPalClient, 'auth_token', 'token'), \
+                mock.patch.object(client.session, 'request', return_value=response), \
+                self.assertLogs('orders.paypal', 'WARNING') as logs, \
+                self.assertRaises(ValueError) as raised:
+            client.capture_order('PAYPAL-ORDER')
+        return str(raised.exception), logs.output[0]
+
+    def test_reports_paypal_issue(self):
+        issue, log = self.capture_failing_with(
+            422, '{"details": [{"issue": "INSTRUMENT_DECLINED"}]}', 'application/json'
+        )
+        self.assertEqual(issue, 'INSTRUMENT_DECLINED')
+        self.assertIn('PAYPAL-ORDER', log)
+
+    def test_non_json_error_body(self):
+        issue, log = self.capture_failing_with(502, '<html>Bad gateway</html>', 'text/html')
+        self.assertEqual(issue, 'Capture failed')
+        self.assertIn('Bad gateway', log)
+
+
+class VerifyPaymentTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('payer')
+        self.product = make_product()
+        self.order = make_order(self.user, self.product, paypal_order_id='PAYPAL-ORDER')
+        patcher = mock.patch('orders.payments.get_paypal_client')
+        self.paypal = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        self.paypal.get_order_status.return_value = {'status': 'APPROVED'}
+
+    def test_paypal_is_called_outside_any_transaction(self):
+        def capture(*args, **kwargs):
+            self.assertFalse(connection.in_atomic_block)
+            return {'status': 'COMPLETED'}
+        self.paypal.capture_order.side_effect = capture
+
+        order = verify_order_payment(self.order)
+
+        self.assertEqual(order.status, 'paid')
+        self.assertIsNone(order.reserved_until)
+
+    def test_concurrent_verifies_capture_once(self):
+        def capture(*args, **kwargs):
+            time.sleep(0.05)
+            return {'status': 'COMPLETED'}
+        self.paypal.capture_order.side_effect = capture
+
+        statuses = run_concurrently(lambda index: verify_order_payment(Order(
+            pk=self.order.pk, paypal_order_id='PAYPAL-ORDER'
+        )).status, 5)
+
+        self.assertEqual(statuses, ['paid'] * 5)
+        self.assertEqual(self.paypal.get_order_status.call_count, 1)
+        self.assertEqual(self.paypal.capture_order.call_count, 1)
+
+    def test_cancel_during_capture_is_refused(self):
+        def capture(*args, **kwargs):
+            # Not blocked: no row lock is held while PayPal is called
+            self.assertFalse(release_order(Order(pk=self.order.pk)))
+            return {'status': 'COMPLETED'}
+        self.paypal.capture_order.side_effect = capture
+
+        order = verify_order_payment(self.order)
+
+        self.assertEqual(order.status, 'paid')
+        self.assertIsNone(order.capture_started_at)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.inventory_count, 10)
+
+    def test_order_released_before_capture_is_not_charged(self):
+        def status(*args, **kwargs):
+            self.assertTrue(release_order(Order(pk=self.order.pk)))
+            return {'status': 'APPROVED'}
+        self.paypal.get_order_status.side_effect = status
+
+        order = verify_order_payment(self.order)
+
+        self.assertEqual(order.status, 'cancelled')
+        self.paypal.capture_order.assert_not_called()
+
+    def test_failed_capture_releases_the_claim(self):
+        self.paypal.capture_order.side_effect = ConnectionError
+
+        with self.assertRaises(ConnectionError):
+            verify_order_payment(self.order)
+
+        self.assertTrue(release_order(self.order))
+
+    def test_stale_claim_does_not_block_release(self):
+        Order.objects.filter(pk=self.order.pk).update(capture_started_at=timezone.now())
+        self.assertFalse(release_order(self.order))
+
+        with override_settings(PAYPAL_CAPTURE_CLAIM_SECONDS=0):
+            self.assertTrue(release_order(self.order))
+
+    def test_cancel_endpoint_reports_capture_in_progress(self):
+        Order.objects.filter(pk=self.order.pk).update(capture_started_at=timezone.now())
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.post(f'/api/orders/{self.order.pk}/cancel/')
+
+        self.assertEqual(response.status_code, 409)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'pending')
+
+
+@override_settings(WEBHOOK_MAX_ATTEMPTS=3)
+class WebhookProcessingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('payer')
+        self.order = make_order(self.user, make_product())
+
+    def payment_succeeded(self, order_id):
+        return WebhookEvent.objects.create(
+            provider='stripe', event_id=f'evt_{order_id}', event_type='payment_intent.succeeded',
+            payload={'data': {'object': {'id': 'pi_1', 'metadata': {'order_id': order_id}}}},
+        )
+
+    def test_marks_order_paid(self):
+        event = self.payment_succeeded(self.order.pk)
+
+        self.assertEqual(process_batch(), 1)
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'processed')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'paid')
+
+    def test_failed_event_waits_before_retrying(self):
+        handler = mock.Mock(side_effect=ConnectionError('database away'))
+        event = self.payment_succeeded(self.order.pk)
+
+        with mock.patch.dict('orders.webhook_events.HANDLERS', {
+            ('stripe', 'payment_intent.succeeded'): handler,
+        }), self.assertLogs('orders.webhook_events', 'ERROR'):
+            self.assertEqual(process_batch(), 1)
+            self.assertEqual(process_batch(), 0)
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'pending')
+        self.assertEqual(event.attempts, 1)
+        self.assertEqual(event.last_error, 'database away')
+        self.assertGreater(event.next_attempt_at, timezone.now())
+
+    def test_payment_for_cancelled_order_fails_at_once(self):
+        release_order(self.order)
+        event = self.payment_succeeded(self.order.pk)
+
+        with self.assertLogs('orders.webhook_events', 'ERROR'):
+            process_batch()
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'failed')
+        self.assertEqual(event.attempts, 1)
+        self.assertIn('cancelled order', event.last_error)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'cancelled')
+
+    def test_payment_for_unknown_order_fails_at_once(self):
+        event = self.payment_succeeded(self.order.pk + 100)
+
+        with self.assertLogs('orders.webhook_events', 'ERROR'):
+            process_batch()
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'failed')
+        self.assertIn('unknown order', event.last_error)
+
+    def test_payment_without_order_id_fails_at_once(self):
+        event = WebhookEvent.objects.create(
+            provider='stripe', event_id='evt_no_order', event_type='payment_intent.succeeded',
+            payload={'data': {'object': {'id': 'pi_1', 'metadata': {}}}},
+        )
+
+        with self.assertLogs('orders.webhook_events', 'ERROR'):
+            process_batch()
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'failed')
+        self.assertEqual(event.attempts, 1)
+        self.assertIn('no order_id', event.last_error)
+
+    def test_duplicate_payment_for_paid_order_is_processed(self):
+        self.payment_succeeded(self.order.pk)
+        process_batch()
+        event = WebhookEvent.objects.create(
+            provider='stripe', event_id='evt_again', event_type='payment_intent.succeeded',
+            payload={'data': {'object': {'id': 'pi_1', 'metadata': {'order_id': self.order.pk}}}},
+        )
+
+        process_batch()
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'processed')
+
+
+class EmailSinkTests(TestCase):
+    @override_settings(EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend')
+    @mock.patch('django.core.mail.backends.smtp.smtplib.SMTP')
+    def test_one_smtp_connection_per_batch(self, smtp):
+        user = User.objects.create_user('buyer', email='buyer@example.com')
+        product = make_product()
+        events = [record_order_event(make_order(user, product), 'order.created') for _ in range(3)]
+        sink = EmailSink()
+
+        sink.open()
+        for event in events:
+            sink.send(event)
+        sink.close()
+
+        self.assertEqual(smtp.call_count, 1)
+        self.assertEqual(smtp.return_value.sendmail.call_count, 3)
+
+
+class RecordingSink(Sink):
+    def __init__(self, name, fail=False, on_send=None):
+        self.name = name
+        self.fail = fail
+        self.on_send = on_send
+        self.sent = []
+
+    def send(self, event):
+        if self.on_send is not None:
+            self.on_send(event)
+        if self.fail:
+            raise ConnectionError(f"{self.name} is down")
+        self.sent.append(event.pk)
+
+
+@override_settings(OUTBOX_MAX_ATTEMPTS=2, OUTBOX_LEASE_SECONDS=300)
+class OutboxDispatchTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('buyer')
+        product = make_product()
+        self.events = [
+            record_order_event(make_order(self.user, product), 'order.created') for _ in range(3)
+        ]
+
+    def dispatch(self, *sinks):
+        with mock.patch('orders.outbox.get_sinks', return_value=list(sinks)):
+            return dispatch_batch()
+
+    def test_delivers_every_event_outside_a_transaction(self):
+        def check(event):
+            self.assertFalse(connection.in_atomic_block)
+        sink = RecordingSink('slack', on_send=check)
+
+        self.assertEqual(self.dispatch(sink), 3)
+
+        self.assertEqual(sink.sent, [event.pk for event in self.events])
+        self.assertEqual(OutboxEvent.objects.filter(status='sent').count(), 3)
+        self.assertEqual(self.dispatch(sink), 0)
+
+    def test_each_result_is_saved_before_the_next_send(self):
+        def check(event):
+            # A crash now would leave the earlier events recorded as sent
+            sent = set(OutboxEvent.objects.filter(status='sent').values_list('pk', flat=True))
+            self.assertEqual(sent, {earlier.pk for earlier in self.events if earlier.pk < event.pk})
+
+        self.dispatch(RecordingSink('slack', on_send=check))
+
+    def test_claimed_events_are_leased_to_one_dispatcher(self):
+        claimed_meanwhile = []
+
+        def dispatch_meanwhile(event):
+            if not claimed_meanwhile:
+                claimed_meanwhile.append(self.dispatch(RecordingSink('other')))
+        sink = RecordingSink('slack', on_send=dispatch_meanwhile)
+
+        self.dispatch(sink)
+
+        self.assertEqual(claimed_meanwhile, [0])
+        self.assertEqual(len(sink.sent), 3)
+
+    def test_failed_sink_is_retried_later_without_resending_to_the_others(self):
+        slack = RecordingSink('slack')
+        email = RecordingSink('email', fail=True)
+        with self.assertLogs('orders.outbox', 'WARNING'):
+            self.dispatch(slack, email)
+
+        event = OutboxEvent.objects.get(pk=self.events[0].pk)
+        self.assertEqual(event.status, 'pending')
+        self.assertEqual(event.attempts, 1)
+        self.assertEqual(event.delivered_to, ['slack'])
+        self.assertEqual(event.last_error, 'email is down')
+        self.assertGreater(event.next_attempt_at, timezone.now())
+
+        OutboxEvent.objects.update(next_attempt_at=timezone.now())
+        email.fail = False
+        self.dispatch(slack, email)
+
+        self.assertEqual(len(slack.sent), 3)
+        self.assertEqual(len(email.sent), 3)
+        self.assertEqual(OutboxEvent.objects.filter(status='sent').count(), 3)
+
+    def test_gives_up_after_max_attempts(self):
+        sink = RecordingSink('slack', fail=True)
+        with self.assertLogs('orders.outbox', 'WARNING'):
+            self.dispatch(sink)
+            OutboxEvent.objects.update(next_attempt_at=timezone.now())
+            self.dispatch(sink)
+
+        self.assertEqual(OutboxEvent.objects.filter(status='failed', attempts=2).count(), 3)
+
+    def test_events_past_the_lease_are_handed_back(self):
+        with override_settings(OUTBOX_LEASE_SECONDS=0):
+            self.assertEqual(self.dispatch(RecordingSink('slack')), 3)
+
+        pending = OutboxEvent.objects.filter(status='pending', attempts=0)
+        self.assertEqual(pending.count(), 3)
+        self.assertFalse(pending.filter(next_attempt_at__gt=timezone.now()).exists())
+
+
+class ThrottledView:
+    throttle_scope = 'test'
+
+
+@override_settings(THROTTLE_ENABLED=True, THROTTLE_SCOPES={'test': {'user': '2/min', 'ip': '3/min'}})
+class TokenBucketThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        patcher = mock.patch('backend.throttling.time.time', return_value=1000.0)
+        self.clock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def allow(self, user):
+        request = RequestFactory().post('/', REMOTE_ADDR='10.0.0.1')
+        request.user = user
+        throttle = TokenBucketThrottle()
+        return throttle.allow_request(request, ThrottledView()), throttle.wait()
+
+    def test_denies_once_a_bucket_is_empty(self):
+        self.assertEqual([self.allow(self.alice)[0] for _ in range(3)], [True, True, False])
+        self.assertAlmostEqual(self.allow(self.alice)[1], 30)
+
+    def test_refills_over_time(self):
+        self.allow(self.alice)
+        self.allow(self.alice)
+
+        self.clock.return_value += 29
+        self.assertFalse(self.allow(self.alice)[0])
+        self.clock.return_value += 1
+        self.assertTrue(self.allow(self.alice)[0])
+
+    def test_denied_request_takes_no_token_from_other_buckets(self):
+        self.allow(self.alice)
+        self.allow(self.alice)
+        # Denied by alice's user bucket; the shared IP bucket keeps its token
+        for _ in range(5):
+            self.assertFalse(self.allow(self.alice)[0])
+
+        self.assertTrue(self.allow(self.bob)[0])
+        self.assertFalse(self.allow(self.bob)[0])
+
+    def test_unscoped_views_are_not_limited(self):
+        request = RequestFactory().get('/')
+        request.user = self.alice
+        self.assertTrue(TokenBucketThrottle().allow_request(request, object()))
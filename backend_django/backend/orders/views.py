@@ -1,117 +1,41 @@
+from decimal import Decimal
+import logging
 from django.shortcuts import render
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from .models import Order, OrderItem, Product
+from .pagination import OrderCursorPagination
 from .serializers import OrderSerializer
-import requests
-import base64
-import json
+from .payments import verify_order_payment
+from .checkout import checkout_status, create_paypal_order, enqueue_paypal_order
+from .outbox import record_order_event
+from .reservations import release_order, reservation_deadline, reserve_order_items
+from store.inventory import InsufficientStock
+from store.lookup import get_products
 from django.conf import settings
+from django.db import transaction
 from rest_framework.decorators import action
+from backend.db_routers import ReplicaReadMixin
 
-class PayPalClient:
-    def __init__(self):
-        self.base_url = (
-            "https://api.sandbox.paypal.com" 
-            if settings.PAYPAL_MODE == "sandbox" 
-            else "https://api.paypal.com"
-        )
-        self.auth_token = self._get_auth_token()
-
-    def _get_auth_token(self):
-        auth = base64.b64encode(
-            f"{settings.PAYPAL_CLIENT_ID}:{settings.PAYPAL_CLIENT_SECRET}".encode()
-        ).decode()
-        
-        headers = {
-            "Authorization": f"Basic {auth}",
-            "Content-Type": "application/x-www-form-urlencoded"
-        }
-        
-        response = requests.post(
-            f"{self.base_url}/v1/oauth2/token",
-            headers=headers,
-            data={"grant_type": "client_credentials"}
-        )
-        response.raise_for_status()
-        return response.json()["access_token"]
-
-    def create_order(self, amount, currency="USD", items=None, order_id=None):
-        headers = {
-            "Authorization": f"Bearer {self.auth_token}",
-            "Content-Type": "application/json",
-            "Prefer": "return=representation"
-        }
-        
-        payload = {
-            "intent": "CAPTURE",
-            "purchase_units": [{
-                "reference_id": str(order_id),
-                "amount": {
-                    "currency_code": currency,
-                    "value": f"{amount:.2f}",
-                    "breakdown": {
-                        "item_total": {
-                            "currency_code": currency,
-                            "value": f"{amount:.2f}"
-                        }
-                    }
-                },
-                "items": items or []
-            }],
-            "application_context": {
-                "brand_name": settings.PAYPAL_BRAND_NAME,
-                "user_action": "PAY_NOW",
-                "return_url": f"{settings.FRONTEND_URL}/order-success",
-                "cancel_url": f"{settings.FRONTEND_URL}/checkout"
-            }
-        }
-        
-        response = requests.post(
-            f"{self.base_url}/v2/checkout/orders",
-            json=payload,
-            headers=headers
-        )
-        response.raise_for_status()
-        return response.json()
-
-    def get_order_status(self, order_id):
-        headers = {
-            "Authorization": f"Bearer {self.auth_token}",
-            "Content-Type": "application/json"
-        }
-        response = requests.get(
-            f"{self.base_url}/v2/checkout/orders/{order_id}",
-            headers=headers
-        )
-        response.raise_for_status()
-        return response.json()
+logger = logging.getLogger(__name__)
 
-    def capture_order(self, order_id):
-        headers = {
-            "Authorization": f"Bearer {self.auth_token}",
-            "Content-Type": "application/json",
-            "Prefer": "return=representation"
-        }
-        
-        try:
-            response = requests.post(
-                f"{self.base_url}/v2/checkout/orders/{order_id}/capture",
-                headers=headers
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.HTTPError as err:
-            error_detail = err.response.json()
-            print(f"PayPal API Error: {error_detail}")
-            raise ValueError(error_detail.get('details', [{}])[0].get('issue', 'Capture failed'))
-
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
-    
+    pagination_class = OrderCursorPagination
+    # Order history; detail views stay on the primary for checkout polling
+    replica_actions = ('list',)
+    throttle_scopes = {
+        'create': 'checkout',
+        'verify_payment': 'payment',
+    }
+
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        queryset = Order.objects.filter(user=self.request.user)
+        if self.action in ('list', 'retrieve'):
+            # Items and their products in two queries total, not per order
+            queryset = queryset.prefetch_related('items__product')
+        return queryset
     
     def create(self, request, *args, **kwargs):
         items = request.data.get('items', [])
@@ -121,54 +45,66 @@ class OrderViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        order = None
         try:
+            # Load every product in the cart with at most one query. Prices
+            # always come from the catalog, never from the client payload.
+            products = get_products(item['product'] for item in items)
+
             # Calculate total and validate items
-            total = 0
+            total = Decimal('0.00')
             paypal_items = []
+            order_items = []
             for item in items:
-                product = Product.objects.get(id=item['product'])
-                price = float(item['price'])
+                product = products.get(int(item['product']))
+                if product is None:
+                    raise Product.DoesNotExist
                 quantity = int(item['quantity'])
-                
-                total += price * quantity
+                if quantity < 1:
+                    raise ValueError("Quantity must be at least 1")
+
+                total += product.price * quantity
+                order_items.append(OrderItem(
+                    product=product,
+                    quantity=quantity,
+                    unit_price=product.price
+                ))
                 paypal_items.append({
                     "name": product.name[:127],
                     "unit_amount": {
                         "currency_code": "USD",
-                        "value": f"{price:.2f}"
+                        "value": f"{product.price:.2f}"
                     },
                     "quantity": str(quantity),
                     "sku": str(product.id)[:127]
                 })
 
-            # Create local order first
-            order = Order.objects.create(
-                user=request.user,
-                total_amount=total,
-                status='pending'
-            )
-
-            # Create order items
-            for item in items:
-                OrderItem.objects.create(
-                    order=order,
-                    product_id=item['product'],
-                    quantity=item['quantity'],
-                    unit_price=item['price']
+            # Reserve stock and create the local order with all of its
+            # items atomically; a shortfall on any product rolls back the rest
+            with transaction.atomic():
+                reserve_order_items(order_items)
+                new_order = Order.objects.create(
+                    user=request.user,
+                    total_amount=total,
+                    status='pending',
+                    reserved_until=reservation_deadline()
+                )
+                for order_item in order_items:
+                    order_item.order = new_order
+                OrderItem.objects.bulk_create(order_items)
+                record_order_event(new_order, 'order.created')
+            order = new_order
+
+            # Hand the PayPal call to the checkout workers; the client
+            # polls checkout-status for the PayPal order id
+            if settings.CHECKOUT_ASYNC:
+                enqueue_paypal_order(order, paypal_items)
+                return Response(
+                    checkout_status(order),
+                    status=status.HTTP_202_ACCEPTED
                 )
 
-            # Create PayPal order
-            paypal = PayPalClient()
-            paypal_order = paypal.create_order(
-                amount=total,
-                items=paypal_items,
-                order_id=order.id
-            )
-
-            # Save PayPal order ID
-            order.paypal_order_id = paypal_order['id']
-            order.paypal_payment_status = paypal_order['status']
-            order.save()
+            paypal_order = create_paypal_order(order, paypal_items)
 
             return Response({
                 'id': paypal_order['id'],
@@ -180,124 +116,74 @@ class OrderViewSet(viewsets.ModelViewSet):
                 {"detail": "Invalid product in order"},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        except InsufficientStock as e:
+            return Response(
+                {"detail": f"Not enough inventory for {products[e.product_id].name}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
-            if 'order' in locals():
-                order.status = 'failed'
-                order.save()
+            if order is not None:
+                release_order(order, status='failed')
             return Response(
                 {"detail": str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-    @action(detail=False, methods=['post'], url_path='verify-payment')
-    def verify_payment(self, request):
-        try:
-            paypal_order_id = request.data.get('orderID')
-            if not paypal_order_id:
-                raise ValueError("Missing PayPal Order ID")
+    @action(detail=True, methods=['get'], url_path='checkout-status')
+    def checkout_status(self, request, pk=None):
+        return Response(checkout_status(self.get_object()))
 
-            paypal = PayPalClient()
-            order_status = paypal.get_order_status(paypal_order_id)
-            
-            # Get order using the correct field name
-            try:
-                order = Order.objects.get(paypal_order_id=paypal_order_id)
-            except Order.DoesNotExist:
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        order = self.get_object()
+        if not release_order(order):
+            order.refresh_from_db(fields=['status'])
+            if order.status == 'pending':
                 return Response(
-                    {'detail': 'Order not found'},
-                    status=status.HTTP_404_NOT_FOUND
+                    {'detail': "Payment for this order is being processed"},
+                    status=status.HTTP_409_CONFLICT
                 )
+            return Response(
+                {'detail': f"Cannot cancel order in {order.status} state"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(self.get_serializer(order).data)
 
-            if order_status['status'] == 'COMPLETED':
-                if order.status != 'paid':
-                    order.status = 'paid'
-                    order.paypal_payment_status = 'COMPLETED'
-                    order.paypal_payment_data = order_status
-                    order.save()
-                    
-                    # Create order items if missing
-                    if not order.items.exists():
-                        purchase_unit = order_status['purchase_units'][0]
-                        for item in purchase_unit.get('items', []):
-                            product = Product.objects.get(id=item['sku'])
-                            OrderItem.objects.create(
-                                order=order,
-                                product=product,
-                                quantity=int(item['quantity']),
-                                price=float(item['unit_amount']['value'])
-                            )
-                
-                return Response({
-                    'status': 'paid',
-                    'order': OrderSerializer(order).data
-                })
+    @action(detail=False, methods=['post'], url_path='verify-payment')
+    def verify_payment(self, request):
+        paypal_order_id = request.data.get('orderID')
+        if not paypal_order_id:
+            return Response(
+                {'detail': 'Missing PayPal Order ID'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-            
-            # Handle different status cases
-            if order_status['status'] == 'COMPLETED':
-                # Order was already captured - just verify and update local record
-                order = Order.objects.get(paypal_order_id=order_id)
-                if order.status != 'paid':  # Only update if not already marked paid
-                    order.status = 'paid'
-                    order.paypal_payment_data = json.dumps(order_status)
-                    order.save()
-                    
-                    if not order.items.exists():
-                        purchase_unit = order_status['purchase_units'][0]
-                        for item in purchase_unit.get('items', []):
-                            product = Product.objects.get(id=item['sku'])
-                            OrderItem.objects.create(
-                                order=order,
-                                product=product,
-                                quantity=int(item['quantity']),
-                                unit_price=float(item['unit_amount']['value'])
-                            )
-                
-                return Response({
-                    'status': 'already_paid',
-                    'order': OrderSerializer(order).data
-                })
-                
-            elif order_status['status'] == 'APPROVED':
-                # Proceed with capture
-                capture_data = paypal.capture_order(order_id)
-                order = Order.objects.get(paypal_order_id=order_id)
-                
-                if capture_data.get('status') == 'COMPLETED':
-                    order.status = 'paid'
-                    order.paypal_payment_data = json.dumps(capture_data)
-                    order.save()
-                    
-                    if not order.items.exists():
-                        purchase_unit = capture_data['purchase_units'][0]
-                        for item in purchase_unit.get('items', []):
-                            product = Product.objects.get(id=item['sku'])
-                            OrderItem.objects.create(
-                                order=order,
-                                product=product,
-                                quantity=int(item['quantity']),
-                                unit_price=float(item['unit_amount']['value'])
-                            )
-                    
-                    return Response({
-                        'status': 'paid',
-                        'order': OrderSerializer(order).data
-                    })
-            
-            else:
-                return Response(
-                    {'detail': f"Cannot process order in {order_status['status']} state"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-                
-        except Order.DoesNotExist:
+        order = self.get_queryset().filter(paypal_order_id=paypal_order_id).first()
+        if order is None:
             return Response(
                 {'detail': 'Order not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
-        except Exception as e:
-            print(f"Error in verify_payment: {str(e)}")
-            return Response(
-                {'detail': str(e)},
-                status=status.HTTP_400_BAD_REQUEST
-            )
\ No newline at end of file
+
+        # Retries of an already settled order are answered locally
+        if not order.is_payment_final:
+            try:
+                order = verify_order_payment(order)
+            except Exception as e:
+                logger.exception("Error in verify_payment")
+                return Response(
+                    {'detail': str(e)},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        if order.status in ('paid', 'shipped', 'delivered'):
+            return Response({
+                'status': 'paid',
+                'order': OrderSerializer(order).data
+            })
+
+        state = order.status if order.is_payment_final else order.paypal_payment_status
+        return Response(
+            {'detail': f"Cannot process order in {state} state"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
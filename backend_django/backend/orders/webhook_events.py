@@ -0,0 +1,101 @@
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Order, WebhookEvent
+from .outbox import record_order_event, retry_delay
+
+logger = logging.getLogger(__name__)
+
+
+class UnprocessableEvent(Exception):
+    """Raised by a handler for an event that can never succeed; it fails without retries."""
+
+
+def handle_payment_intent_succeeded(event):
+    payment_intent = event['data']['object']
+    order_id = (payment_intent.get('metadata') or {}).get('order_id')
+    if not order_id:
+        raise UnprocessableEvent(f"Payment {payment_intent['id']} has no order_id in its metadata")
+
+    order = Order.objects.select_for_update().filter(id=order_id).first()
+    if order is None:
+        raise UnprocessableEvent(
+            f"Payment {payment_intent['id']} succeeded for unknown order {order_id}"
+        )
+    if order.status in ('cancelled', 'failed'):
+        # Money was taken for an order that no longer holds stock
+        raise UnprocessableEvent(
+            f"Payment {payment_intent['id']} succeeded for {order.status} order {order_id}; "
+            "refund or restore it"
+        )
+    if order.is_payment_final:
+        return
+
+    order.transition_to('paid')
+    order.reserved_until = None
+    order.stripe_payment_intent_id = payment_intent['id']
+    order.save()
+    # The payment confirmation email goes out through the outbox
+    record_order_event(order, 'order.paid')
+
+
+HANDLERS = {
+    ('stripe', 'payment_intent.succeeded'): handle_payment_intent_succeeded,
+}
+
+
+def process_event(event):
+    handler = HANDLERS.get((event.provider, event.event_type))
+    if handler is not None:
+        handler(event.payload)
+
+
+def process_batch(batch_size=100):
+    """
+    Process up to ``batch_size`` pending events; returns how many were claimed.
+
+    Rows are claimed with SKIP LOCKED, so any number of workers can drain
+    the queue side by side without handling an event twice. Each event runs
+    in its own savepoint: a failing event is retried with exponential
+    backoff until WEBHOOK_MAX_ATTEMPTS, without holding up the rest of the
+    batch. UnprocessableEvent fails it at once.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        events = list(
+            WebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('id')[:batch_size]
+        )
+        for event in events:
+            event.attempts += 1
+            try:
+                with transaction.atomic():
+                    process_event(event)
+            except UnprocessableEvent as e:
+                logger.error("Webhook event %s failed: %s", event.event_id, e)
+                event.last_error = str(e)
+                event.status = 'failed'
+            except Exception as e:
+                logger.exception("Webhook event %s failed", event.event_id)
+                event.last_error = str(e)
+                if event.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+                    event.status = 'failed'
+                else:
+                    event.next_attempt_at = now + retry_delay(
+                        event.attempts,
+                        settings.WEBHOOK_BACKOFF_SECONDS,
+                        settings.WEBHOOK_MAX_BACKOFF_SECONDS,
+                    )
+            else:
+                event.status = 'processed'
+                event.processed_at = now
+                event.last_error = ''
+
+        WebhookEvent.objects.bulk_update(
+            events, ['status', 'attempts', 'last_error', 'next_attempt_at', 'processed_at']
+        )
+    return len(events)
@@ -1,15 +1,16 @@
 from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
-from .models import Order
+from .models import WebhookEvent
 import stripe
 import json
 
 @csrf_exempt
 def stripe_webhook(request):
     payload = request.body
-    sig_header = request.META['HTTP_STRIPE_SIGNATURE']
-    event = None
+    sig_header = request.META.get('HTTP_STRIPE_SIGNATURE')
+    if not sig_header:
+        return HttpResponse(status=400)
     
     try:
         event = stripe.Webhook.construct_event(
@@ -20,20 +21,16 @@ def stripe_webhook(request):
     except stripe.error.SignatureVerificationError as e:
         return HttpResponse(status=400)
     
-    # Handle payment intent succeeded
-    if event['type'] == 'payment_intent.succeeded':
-        payment_intent = event['data']['object']
-        order_id = payment_intent['metadata']['order_id']
-        
-        try:
-            order = Order.objects.get(id=order_id)
-            order.status = 'paid'
-            order.save()
-            
-            # Send payment confirmation email
-            # (similar to order confirmation but with payment details)
-            
-        except Order.DoesNotExist:
-            pass
+    # Only persist the event here; process_webhook_events handles it
+    # outside the request so Stripe is never kept waiting. Redeliveries of
+    # an event already stored are dropped by the unique event id.
+    WebhookEvent.objects.bulk_create([
+        WebhookEvent(
+            provider='stripe',
+            event_id=event['id'],
+            event_type=event['type'],
+            payload=json.loads(payload),
+        )
+    ], ignore_conflicts=True)
     
-    return HttpResponse(status=200)
\ No newline at end of file
+    return HttpResponse(status=200)
@@ -0,0 +1,56 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+
+CATALOG_STATE_KEY = 'catalog:state'
+
+
+def _new_state(last_modified):
+    return {
+        'version': f"{time.time_ns():x}",
+        'last_modified': last_modified,
+    }
+
+
+def get_catalog_state():
+    """
+    Return the catalog's current ``version`` and ``last_modified`` time.
+
+    Both are kept in the cache and replaced whenever a product changes, so
+    answering a conditional GET does not need to touch the database. On a
+    cold cache ``last_modified`` is seeded from ``Product.updated_at``.
+    """
+    state = cache.get(CATALOG_STATE_KEY)
+    if state is None:
+        from .models import Product
+
+        last_modified = (
+            Product.objects.aggregate(last=Max('updated_at'))['last']
+            or timezone.now()
+        )
+        state = _new_state(last_modified)
+        # add() so a concurrent bump is never overwritten by a stale seed
+        if not cache.add(CATALOG_STATE_KEY, state, None):
+            state = cache.get(CATALOG_STATE_KEY, state)
+    return state
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog page."""
+    cache.set(CATALOG_STATE_KEY, _new_state(timezone.now()), None)
+
+
+def _request_digest(request):
+    # Page URLs and image URLs are absolute, so the host is part of the key
+    return hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+
+
+def catalog_page_key(state, request):
+    return f"catalog:{state['version']}:{_request_digest(request)}"
+
+
+def catalog_etag(state, request):
+    return f'"{state["version"]}-{_request_digest(request)}"'
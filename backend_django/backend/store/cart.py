@@ -0,0 +1,175 @@
+from collections import Counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q, Sum
+
+from .cache import get_catalog_state
+from .lookup import get_products
+from .models import CartItem
+
+BULK_MODES = ('merge', 'set', 'remove')
+
+
+class CartError(Exception):
+    def __init__(self, message, product_ids=()):
+        self.message = message
+        self.product_ids = sorted(product_ids)
+        super().__init__(message)
+
+
+def parse_bulk_items(mode, items):
+    """
+    Turn ``[{'product_id': ..., 'quantity': ...}, ...]`` into
+    ``{product_id: quantity}``.
+
+    Repeated products are added up when merging and the last entry wins
+    when setting. ``product`` is accepted as an alias of ``product_id``, as
+    in the single-item endpoint.
+    """
+    if not isinstance(items, list) or not items:
+        raise CartError("items must be a non-empty list")
+
+    quantities = Counter() if mode == 'merge' else {}
+    for item in items:
+        if not isinstance(item, dict):
+            raise CartError("Each item must be an object")
+        try:
+            product_id = int(item.get('product_id') or item.get('product'))
+            quantity = int(item.get('quantity', 1))
+        except (TypeError, ValueError):
+            raise CartError("Each item needs a numeric product_id and quantity")
+
+        if mode == 'merge':
+            if quantity < 1:
+                raise CartError("Quantity must be at least 1", [product_id])
+            quantities[product_id] += quantity
+        else:
+            quantities[product_id] = quantity
+    return dict(quantities)
+
+
+def bulk_update_cart(user, mode, quantities):
+    """
+    Apply many cart changes for ``user`` in one transaction.
+
+    ``merge`` adds to the quantities already in the cart, ``set`` replaces
+    them (0 or less removes the item) and ``remove`` drops the products.
+    Products are loaded with one query and the surviving rows are written
+    with a single upsert on the (user, product) unique constraint. Nothing
+    is written if any product is missing or would exceed its inventory.
+
+    Merges and sets for one user run one at a time, behind a lock on the
+    user row. Locking the cart rows is not enough: a product not yet in the
+    cart has no row to lock, so two concurrent merges would both start from
+    0 and the second upsert would drop the first one's quantity.
+    """
+    with transaction.atomic():
+        if mode == 'remove':
+            CartItem.objects.filter(user=user, product_id__in=quantities).delete()
+            return
+
+        list(get_user_model().objects.select_for_update().filter(pk=user.pk).values_list('pk'))
+
+        products = get_products(quantities)
+        # Setting a quantity of 0 removes the item even if the product is gone
+        missing = {
+            product_id for product_id, quantity in quantities.items() if quantity >= 1
+        } - set(products)
+        if missing:
+            raise CartError("Product not found", missing)
+
+        if mode == 'merge':
+            existing = dict(
+                CartItem.objects.filter(user=user, product_id__in=quantities)
+                .values_list('product_id', 'quantity')
+            )
+            quantities = {
+                product_id: existing.get(product_id, 0) + quantity
+                for product_id, quantity in quantities.items()
+            }
+
+        removed = [product_id for product_id, quantity in quantities.items() if quantity < 1]
+        over = [
+            product_id for product_id, quantity in quantities.items()
+            if quantity >= 1 and quantity > products[product_id].inventory_count
+        ]
+        if over:
+            raise CartError("Cannot exceed available inventory", over)
+
+        if removed:
+            CartItem.objects.filter(user=user, product_id__in=removed).delete()
+        # bulk_create sends no signals, so invalidate here
+        invalidate_cart_summary(user.pk)
+        CartItem.objects.bulk_create(
+            [
+                CartItem(user=user, product_id=product_id, quantity=quantity)
+                for product_id, quantity in sorted(quantities.items())
+                if quantity >= 1
+            ],
+            update_conflicts=True,
+            unique_fields=['user', 'product'],
+            update_fields=['quantity', 'updated_at'],
+        )
+
+
+def cart_summary_key(user_id):
+    return f"cart:summary:{user_id}"
+
+
+def invalidate_cart_summary(user_id):
+    """Drop the cached summary once the current transaction commits."""
+    transaction.on_commit(lambda: cache.delete(cart_summary_key(user_id)))
+
+
+def compute_cart_summary(user):
+    items = CartItem.objects.filter(user=user)
+    totals = items.aggregate(
+        item_count=Sum('quantity'),
+        subtotal=Sum(F('quantity') * F('product__price')),
+    )
+    warnings = [
+        {
+            'product_id': row['product_id'],
+            'name': row['product__name'],
+            'quantity': row['quantity'],
+            'available': row['product__inventory_count'] if row['product__status'] == 'active' else 0,
+        }
+        for row in items.filter(
+            Q(quantity__gt=F('product__inventory_count')) | ~Q(product__status='active')
+        ).order_by('product_id').values(
+            'product_id', 'product__name', 'product__status',
+            'product__inventory_count', 'quantity',
+        )
+    ]
+    return {
+        'item_count': totals['item_count'] or 0,
+        'subtotal': '{:f}'.format((totals['subtotal'] or Decimal('0')).quantize(Decimal('0.01'))),
+        'warnings': warnings,
+    }
+
+
+def get_cart_summary(user):
+    """
+    Item count, subtotal and stock warnings for ``user``'s cart.
+
+    Totals come from a single aggregate query. The result is cached per
+    user and tagged with the catalog version, so product edits are picked
+    up as well as the user's own cart writes. Stock warnings may lag by up
+    to CART_SUMMARY_CACHE_TIMEOUT, as checkouts do not bump the version.
+    """
+    key = cart_summary_key(user.pk)
+    version = get_catalog_state()['version']
+    cached = cache.get(key)
+    if cached is not None and cached['catalog_version'] == version:
+        return cached['summary']
+
+    summary = compute_cart_summary(user)
+    cache.set(
+        key, {'catalog_version': version, 'summary': summary},
+        settings.CART_SUMMARY_CACHE_TIMEOUT
+    )
+    return summary
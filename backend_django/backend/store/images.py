@@ -0,0 +1,145 @@
+"""
+Pre-generated product image derivatives.
+
+Every size in PRODUCT_IMAGE_SIZES is rendered as WebP plus a JPEG (or PNG,
+for images with transparency) fallback and stored next to the uploads under
+``products/derived/``. File names carry a hash of their content, so they
+never change once written and can be served with far-future cache headers.
+
+Product.images records what was generated::
+
+    {"source": "products/shoe.jpg",
+     "variants": {"card": {"width": 480, "height": 360,
+                           "webp": "products/derived/shoe-card-1a2b3c4d5e6f.webp",
+                           "jpeg": "products/derived/shoe-card-9f8e7d6c5b4a.jpg"}}}
+
+Variants are only exposed while ``source`` still matches the product's image.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+from io import BytesIO
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .cache import bump_catalog_version
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+DERIVED_DIR = 'products/derived'
+
+_storage = Product._meta.get_field('image').storage
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.PRODUCT_IMAGE_WORKERS,
+                    thread_name_prefix='product-images',
+                )
+    return _executor
+
+
+def _encode(image, fmt):
+    buffer = BytesIO()
+    if fmt == 'webp':
+        image.save(buffer, 'WEBP', quality=80, method=4)
+    elif fmt == 'png':
+        image.save(buffer, 'PNG', optimize=True)
+    else:
+        image.save(buffer, 'JPEG', quality=82, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def _store(stem, size_name, fmt, data):
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    ext = 'jpg' if fmt == 'jpeg' else fmt
+    name = f"{DERIVED_DIR}/{stem}-{size_name}-{digest}.{ext}"
+    # Content-addressed: an existing file already holds these exact bytes
+    if not _storage.exists(name):
+        name = _storage.save(name, ContentFile(data))
+    return name
+
+
+def render_variants(source_name):
+    """Render and store every configured size of ``source_name``."""
+    with _storage.open(source_name, 'rb') as source:
+        original = ImageOps.exif_transpose(Image.open(source))
+        original.load()
+
+    has_alpha = original.mode in ('RGBA', 'LA') or 'transparency' in original.info
+    original = original.convert('RGBA' if has_alpha else 'RGB')
+    fallback = 'png' if has_alpha else 'jpeg'
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+
+    variants = {}
+    for size_name, longest in settings.PRODUCT_IMAGE_SIZES.items():
+        image = original.copy()
+        # Never upscale: small uploads keep their own size
+        image.thumbnail((longest, longest), Image.LANCZOS)
+        variants[size_name] = {
+            'width': image.width,
+            'height': image.height,
+            'webp': _store(stem, size_name, 'webp', _encode(image, 'webp')),
+            fallback: _store(stem, size_name, fallback, _encode(image, fallback)),
+        }
+    return {'source': source_name, 'variants': variants}
+
+
+def generate_product_images(product_id):
+    """
+    Generate derivatives for one product and record them.
+
+    The row is only updated if its image is still the one that was rendered,
+    so a newer upload is never overwritten with stale variants.
+    """
+    source_name = Product.objects.filter(pk=product_id).values_list('image', flat=True).first()
+    if not source_name:
+        return False
+
+    images = render_variants(source_name)
+    updated = Product.objects.filter(pk=product_id, image=source_name).update(
+        images=images,
+        updated_at=timezone.now(),
+    )
+    if updated:
+        # update() sends no signals
+        transaction.on_commit(bump_catalog_version)
+    return bool(updated)
+
+
+def _run_generate_product_images(product_id):
+    close_old_connections()
+    try:
+        generate_product_images(product_id)
+    except Exception:
+        logger.exception("Generating images failed for product %s", product_id)
+    finally:
+        close_old_connections()
+
+
+def needs_images(product):
+    return bool(product.image) and product.images.get('source') != product.image.name
+
+
+def schedule_product_images(product):
+    """Generate ``product``'s derivatives once the current transaction commits."""
+    if settings.PRODUCT_IMAGE_ASYNC:
+        transaction.on_commit(
+            lambda: _get_executor().submit(_run_generate_product_images, product.pk)
+        )
+    else:
+        transaction.on_commit(lambda: generate_product_images(product.pk))
@@ -0,0 +1,52 @@
+from django.db.models import F
+from django.utils import timezone
+
+from .lookup import invalidate_products
+from .models import Product
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_id):
+        self.product_id = product_id
+        super().__init__(f"Not enough inventory for product {product_id}")
+
+
+def reserve_stock(quantities):
+    """
+    Take ``{product_id: quantity}`` out of inventory.
+
+    Each product is decremented with a single conditional UPDATE
+    (``inventory_count >= quantity``), so concurrent checkouts can never
+    drive stock below zero. Rows are touched in primary key order to avoid
+    lock-order deadlocks between multi-product carts. Call this inside
+    ``transaction.atomic()`` so a shortfall on one product rolls back the
+    others.
+
+    Stock changes leave the catalog version alone, so checkouts do not wipe
+    every cached catalog page: listed ``inventory_count`` may lag by up to
+    CATALOG_CACHE_TIMEOUT, and this UPDATE is what actually guards stock.
+    """
+    now = timezone.now()
+    for product_id in sorted(quantities):
+        quantity = quantities[product_id]
+        updated = Product.objects.filter(
+            pk=product_id,
+            inventory_count__gte=quantity,
+        ).update(
+            inventory_count=F('inventory_count') - quantity,
+            updated_at=now,
+        )
+        if not updated:
+            raise InsufficientStock(product_id)
+    invalidate_products(quantities)
+
+
+def release_stock(quantities):
+    """Put ``{product_id: quantity}`` back into inventory."""
+    now = timezone.now()
+    for product_id in sorted(quantities):
+        Product.objects.filter(pk=product_id).update(
+            inventory_count=F('inventory_count') + quantities[product_id],
+            updated_at=now,
+        )
+    invalidate_products(quantities)
@@ -0,0 +1,120 @@
+"""
+Product lookups for the cart and checkout paths.
+
+A product is resolved in three steps:
+
+1. The request's identity map. ProductLookupMiddleware starts an empty one
+   for each request, so validating, pricing and re-checking the same
+   product within a request loads it only once.
+2. A process-wide LRU of product rows that expires after
+   PRODUCT_LOOKUP_TTL seconds. This keeps hot SKUs in memory across
+   requests. Each row is stored with the catalog version it was read
+   under and counts as a miss once the version has moved on.
+3. One query for everything still missing.
+
+Whole rows are cached, so the instances returned are complete and
+serializers need no further queries. They are read-only snapshots.
+
+Product saves and deletes bump the shared catalog version, which
+invalidates the rows in every process. Stock changes leave the version
+alone. They only drop the affected rows from this process's cache when
+the transaction commits, so stock can lag by up to the TTL in other
+processes. That is fine for validation because reserve_stock() checks
+stock again with a conditional UPDATE. Both kinds of change drop the rows
+from the current request's identity map straight away.
+"""
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from backend.caching import TTLCache
+
+from .cache import get_catalog_state
+from .models import Product
+
+_FIELDS = [field.attname for field in Product._meta.concrete_fields]
+
+# product id -> (catalog version, row)
+product_row_cache = TTLCache(
+    max_size=settings.PRODUCT_LOOKUP_CACHE_SIZE,
+    ttl=settings.PRODUCT_LOOKUP_TTL,
+)
+
+# product id -> Product, or None for ids known not to exist
+_identity_map = ContextVar('product_identity_map', default=None)
+
+
+def get_products(product_ids, active_only=True):
+    """
+    Return ``{id: Product}`` for those of ``product_ids`` that exist (and,
+    with ``active_only``, are active). Raises ValueError for non-numeric ids.
+    """
+    product_ids = {int(product_id) for product_id in product_ids}
+    identity_map = _identity_map.get()
+    if identity_map is None:
+        identity_map = {}
+
+    missing = set()
+    unseen = product_ids - identity_map.keys()
+    if unseen:
+        # Read before the query, so a row is never filed under a version
+        # newer than itself
+        version = get_catalog_state()['version']
+    for product_id in unseen:
+        cached = product_row_cache.get(product_id)
+        if cached is None or cached[0] != version:
+            missing.add(product_id)
+        else:
+            identity_map[product_id] = Product.from_db(DEFAULT_DB_ALIAS, _FIELDS, cached[1])
+
+    if missing:
+        for row in Product.objects.filter(pk__in=missing).values_list(*_FIELDS):
+            product_row_cache.set(row[0], (version, row))
+            identity_map[row[0]] = Product.from_db(DEFAULT_DB_ALIAS, _FIELDS, row)
+            missing.discard(row[0])
+        identity_map.update(dict.fromkeys(missing))
+
+    products = {}
+    for product_id in product_ids:
+        product = identity_map[product_id]
+        if product is not None and (product.status == 'active' or not active_only):
+            products[product_id] = product
+    return products
+
+
+def get_product(product_id, active_only=True):
+    """Return one product, raising Product.DoesNotExist if there is none."""
+    try:
+        return get_products([product_id], active_only)[int(product_id)]
+    except (KeyError, TypeError, ValueError):
+        raise Product.DoesNotExist(f"No product with id {product_id!r}")
+
+
+def invalidate_products(product_ids):
+    """Forget ``product_ids`` now in this request, and everywhere in the process on commit."""
+    product_ids = list(product_ids)
+    identity_map = _identity_map.get()
+    if identity_map is not None:
+        for product_id in product_ids:
+            identity_map.pop(product_id, None)
+
+    def drop():
+        for product_id in product_ids:
+            product_row_cache.invalidate(product_id)
+
+    transaction.on_commit(drop)
+
+
+class ProductLookupMiddleware:
+    """Give each request its own product identity map."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _identity_map.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            _identity_map.reset(token)
@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.models import Product
+from store.product_io import FORMATS, detect_format, export_products
+
+
+class Command(BaseCommand):
+    help = "Stream every product to a CSV or JSON Lines file that import_products accepts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to write, or - for stdout")
+        parser.add_argument('--format', choices=FORMATS, help="Default: from the file extension")
+        parser.add_argument('--status', choices=[value for value, _ in Product.STATUS_CHOICES])
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            fmt = detect_format(path, options['format'])
+        except ValueError as e:
+            raise CommandError(e)
+
+        stream = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+        try:
+            count = export_products(stream, fmt, options['status'], options['chunk_size'])
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        if stream is not sys.stdout:
+            self.stdout.write(f"Exported {count} product(s) to {path}")
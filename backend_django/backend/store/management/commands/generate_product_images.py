@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from store.images import generate_product_images, needs_images
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = "Generate resized and WebP derivatives for product images that lack them"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help="Regenerate every product image, e.g. after changing PRODUCT_IMAGE_SIZES"
+        )
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True).only('id', 'image', 'images')
+        generated = failed = 0
+        for product in products.iterator(chunk_size=500):
+            if not options['all'] and not needs_images(product):
+                continue
+            try:
+                generated += generate_product_images(product.pk)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Product {product.pk}: {e}")
+        self.stdout.write(f"Generated images for {generated} product(s), {failed} failed")
@@ -0,0 +1,41 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.product_io import FORMATS, ProductImportError, detect_format, import_products, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or update products from a CSV or JSON Lines file, streamed in "
+        "batches. Rows with an id update that product; see store.product_io"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or - for stdin")
+        parser.add_argument('--format', choices=FORMATS, help="Default: from the file extension")
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            fmt = detect_format(path, options['format'])
+        except ValueError as e:
+            raise CommandError(e)
+
+        started = time.perf_counter()
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            result = import_products(read_rows(stream, fmt), options['batch_size'])
+        except ProductImportError as e:
+            raise CommandError(f"{e}; batches before this line were imported")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.stdout.write(
+            f"Imported {result['written']} product(s), skipped {result['skipped']} "
+            f"in {time.perf_counter() - started:.1f}s. "
+            "Run generate_product_images for new or changed images."
+        )
@@ -0,0 +1,96 @@
+from decimal import Decimal
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from orders.models import Order, OrderItem
+from store.cache import bump_catalog_version
+from store.models import CartItem, Product
+
+WORDS = [
+    'classic', 'leather', 'wireless', 'organic', 'cotton', 'steel', 'travel',
+    'compact', 'vintage', 'premium', 'outdoor', 'kitchen', 'desk', 'running',
+    'wool', 'ceramic', 'bamboo', 'portable', 'smart', 'handmade',
+]
+NOUNS = [
+    'backpack', 'headphones', 'mug', 'jacket', 'lamp', 'notebook', 'bottle',
+    'shoes', 'speaker', 'watch', 'blanket', 'chair', 'knife', 'scarf', 'wallet',
+]
+
+
+class Command(BaseCommand):
+    help = "Seed products, users, carts and orders for load tests and benchmarks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--cart-items', type=int, default=3, help="Cart items per user")
+        parser.add_argument('--orders', type=int, default=5, help="Paid orders per user")
+        parser.add_argument('--prefix', default='loaduser', help="Username prefix")
+        parser.add_argument('--password', default='loadtest-pass')
+        parser.add_argument('--seed', type=int, default=1, help="Random seed")
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        prefix = options['prefix']
+
+        products = Product.objects.bulk_create(
+            [
+                Product(
+                    name=f"{rng.choice(WORDS).title()} {rng.choice(NOUNS)} {i}",
+                    description=" ".join(rng.choice(WORDS + NOUNS) for _ in range(30)),
+                    price=Decimal(rng.randint(100, 50000)) / 100,
+                    inventory_count=rng.randint(1000, 5000),
+                )
+                for i in range(options['products'])
+            ],
+            batch_size=1000,
+        )
+
+        # Hashing is deliberately slow; every seeded user shares one hash
+        password = make_password(options['password'])
+        User.objects.bulk_create(
+            [
+                User(username=f"{prefix}{i}", email=f"{prefix}{i}@example.com", password=password)
+                for i in range(options['users'])
+            ]
+            + [User(username=f"{prefix}-admin", email=f"{prefix}-admin@example.com",
+                    password=password, is_staff=True)],
+            ignore_conflicts=True,
+        )
+        users = list(User.objects.filter(username__startswith=prefix, is_staff=False))
+
+        cart_items = []
+        orders = []
+        order_items = []
+        for user in users:
+            for product in rng.sample(products, min(options['cart_items'], len(products))):
+                cart_items.append(CartItem(user=user, product=product, quantity=rng.randint(1, 3)))
+            for _ in range(options['orders']):
+                lines = [
+                    OrderItem(product=product, quantity=rng.randint(1, 3), unit_price=product.price)
+                    for product in rng.sample(products, min(3, len(products)))
+                ]
+                order = Order(
+                    user=user,
+                    status='paid',
+                    total_amount=sum(line.unit_price * line.quantity for line in lines),
+                )
+                orders.append(order)
+                for line in lines:
+                    line.order = order
+                order_items.extend(lines)
+
+        CartItem.objects.bulk_create(cart_items, batch_size=1000, ignore_conflicts=True)
+        Order.objects.bulk_create(orders, batch_size=1000)
+        OrderItem.objects.bulk_create(order_items, batch_size=1000)
+        transaction.on_commit(bump_catalog_version)
+
+        self.stdout.write(
+            f"Seeded {len(products)} products, {len(users)} users (+ {prefix}-admin), "
+            f"{len(cart_items)} cart items, {len(orders)} orders"
+        )
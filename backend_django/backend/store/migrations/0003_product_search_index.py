@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:29
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class AddIndexOnPostgreSQL(AddIndexConcurrently):
+    """
+    The GIN/tsvector index only exists on PostgreSQL. Other backends (SQLite
+    for local development) record it in the migration state only.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('store', '0002_remove_product_image_url_product_image'),
+    ]
+
+    operations = [
+        AddIndexOnPostgreSQL(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('name', 'description', config='english'), name='store_product_search_idx'),
+        ),
+    ]
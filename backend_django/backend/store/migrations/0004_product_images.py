@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:38
+
+import django.contrib.postgres.search
+import store.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0003_product_search_index'),
+    ]
+
+    operations = [
+        # Same index, now a SearchIndex so SQLite can rebuild the table below
+        # without trying to create it. Nothing changes in the database.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveIndex(
+                    model_name='product',
+                    name='store_product_search_idx',
+                ),
+                migrations.AddIndex(
+                    model_name='product',
+                    index=store.search.SearchIndex(django.contrib.postgres.search.SearchVector('name', 'description', config='english'), name='store_product_search_idx'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='images',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import FileExtensionValidator
 
+from .search import SearchIndex, product_search_vector
+
 User = get_user_model()
 
 class Product(models.Model):
@@ -20,6 +22,8 @@ class Product(models.Model):
         blank=True,
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'webp'])]
     )
+    # Resized/WebP derivatives of ``image``, filled in by store.images
+    images = models.JSONField(default=dict, blank=True, editable=False)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -32,6 +36,8 @@ class Product(models.Model):
             models.Index(fields=['name']),
             models.Index(fields=['price']),
             models.Index(fields=['created_at']),
+            # Full-text search; created on PostgreSQL only (see migration 0003)
+            SearchIndex(product_search_vector(), name='store_product_search_idx'),
         ]
 
 class CartItem(models.Model):
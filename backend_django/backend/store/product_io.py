@@ -0,0 +1,263 @@
+"""
+Streaming product import and export as CSV or JSON Lines.
+
+Both directions keep one batch of rows in memory, whatever the file size.
+Imports upsert on ``id``:
+
+- A file with ``name`` and ``price`` columns creates rows without an id and
+  upserts the rest, with ``bulk_create(update_conflicts=True)`` where the
+  database supports it, else bulk_update plus bulk_create.
+- A file without them, e.g. ``id,price,inventory_count``, only updates
+  existing products with bulk_update and skips unknown ids.
+
+Columns the importer does not know, such as the timestamps in an export,
+are ignored, so an export can be imported back as is. bulk_create and
+bulk_update send no signals. The catalog version and the product lookup
+cache are therefore invalidated once, after the last batch, and image
+derivatives are left to the generate_product_images command.
+"""
+import csv
+from decimal import Decimal, InvalidOperation
+import json
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cache import bump_catalog_version
+from .lookup import product_row_cache
+from .models import Product
+
+FORMATS = ('csv', 'jsonl')
+EXPORT_FIELDS = (
+    'id', 'name', 'description', 'price', 'inventory_count', 'status', 'image',
+    'created_at', 'updated_at',
+)
+IMPORT_FIELDS = ('id', 'name', 'description', 'price', 'inventory_count', 'status', 'image')
+REQUIRED_FIELDS = ('name', 'price')
+
+_STATUSES = {value for value, _ in Product.STATUS_CHOICES}
+_NAME_MAX_LENGTH = Product._meta.get_field('name').max_length
+_PRICE_MAX = Decimal(10) ** (
+    Product._meta.get_field('price').max_digits - Product._meta.get_field('price').decimal_places
+)
+
+
+class ProductImportError(Exception):
+    def __init__(self, line, message):
+        self.line = line
+        self.message = message
+        super().__init__(f"line {line}: {message}")
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    if path.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if path.endswith('.csv'):
+        return 'csv'
+    raise ValueError(f"Cannot tell the format of {path!r}; pass --format")
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, row_dict)`` pairs from a CSV or JSONL stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            raise ProductImportError(line_number, f"invalid JSON ({e})")
+        if not isinstance(row, dict):
+            raise ProductImportError(line_number, "expected a JSON object")
+        yield line_number, row
+
+
+def _text(value):
+    return '' if value is None else str(value)
+
+
+def write_rows(stream, fmt, rows, fields=EXPORT_FIELDS):
+    """Write ``values_list`` tuples in ``fields`` order; returns the row count."""
+    count = 0
+    if fmt == 'csv':
+        writer = csv.writer(stream)
+        writer.writerow(fields)
+        for count, row in enumerate(rows, 1):
+            writer.writerow([
+                value.isoformat() if hasattr(value, 'isoformat') else _text(value)
+                for value in row
+            ])
+        return count
+    for count, row in enumerate(rows, 1):
+        record = {
+            field: str(value) if isinstance(value, Decimal)
+            else value.isoformat() if hasattr(value, 'isoformat')
+            else value
+            for field, value in zip(fields, row)
+        }
+        stream.write(json.dumps(record, ensure_ascii=False))
+        stream.write('\n')
+    return count
+
+
+def _convert(line, row, columns):
+    """Validate one input row and return Product field values."""
+    values = {}
+    for column in columns:
+        raw = row.get(column)
+        if column == 'id':
+            if raw in (None, ''):
+                values['id'] = None
+                continue
+            try:
+                values['id'] = int(raw)
+            except (TypeError, ValueError):
+                raise ProductImportError(line, f"id must be an integer, got {raw!r}")
+        elif column == 'name':
+            name = _text(raw).strip()
+            if not name or len(name) > _NAME_MAX_LENGTH:
+                raise ProductImportError(line, f"name must be 1-{_NAME_MAX_LENGTH} characters")
+            values['name'] = name
+        elif column == 'price':
+            try:
+                price = Decimal(str(raw).strip()).quantize(Decimal('0.01'))
+            except (InvalidOperation, TypeError, ValueError):
+                raise ProductImportError(line, f"price must be a decimal, got {raw!r}")
+            if not 0 <= price < _PRICE_MAX:
+                raise ProductImportError(line, f"price out of range: {raw!r}")
+            values['price'] = price
+        elif column == 'inventory_count':
+            try:
+                count = int(raw if raw not in (None, '') else 0)
+            except (TypeError, ValueError):
+                raise ProductImportError(line, f"inventory_count must be an integer, got {raw!r}")
+            if count < 0:
+                raise ProductImportError(line, "inventory_count cannot be negative")
+            values['inventory_count'] = count
+        elif column == 'status':
+            status = _text(raw).strip() or 'active'
+            if status not in _STATUSES:
+                raise ProductImportError(line, f"status must be one of {', '.join(sorted(_STATUSES))}")
+            values['status'] = status
+        else:
+            values[column] = _text(raw)
+    return values
+
+
+class ProductImporter:
+    """Upserts batches of validated rows; see the module docstring."""
+
+    def __init__(self, columns):
+        self.columns = [column for column in IMPORT_FIELDS if column in columns]
+        self.update_only = not all(field in self.columns for field in REQUIRED_FIELDS)
+        if self.update_only and 'id' not in self.columns:
+            raise ProductImportError(
+                1, f"need an id column, or {' and '.join(REQUIRED_FIELDS)} columns to create products"
+            )
+        self.update_fields = [column for column in self.columns if column != 'id'] + ['updated_at']
+        self.upsert = connection.features.supports_update_conflicts_with_target
+        self.written = 0
+        self.skipped = 0
+        self.explicit_ids = False
+
+    def write(self, batch):
+        # Last row wins for an id repeated within a batch; PostgreSQL
+        # refuses to upsert the same row twice in one statement
+        with_id = list({
+            values['id']: values for values in batch if values.get('id') is not None
+        }.values())
+        without_id = [values for values in batch if values.get('id') is None]
+
+        with transaction.atomic():
+            if without_id and self.update_only:
+                self.skipped += len(without_id)
+            elif without_id:
+                Product.objects.bulk_create([Product(**values) for values in without_id])
+                self.written += len(without_id)
+
+            if with_id and self.upsert and not self.update_only:
+                Product.objects.bulk_create(
+                    [Product(**values) for values in with_id],
+                    update_conflicts=True,
+                    unique_fields=['id'],
+                    update_fields=self.update_fields,
+                )
+                self.written += len(with_id)
+                self.explicit_ids = True
+            elif with_id:
+                self._update_or_create(with_id)
+
+    def _update_or_create(self, rows):
+        existing = set(
+            Product.objects.filter(pk__in=[values['id'] for values in rows])
+            .values_list('pk', flat=True)
+        )
+        now = timezone.now()
+        updates = [Product(**values, updated_at=now) for values in rows if values['id'] in existing]
+        creates = [Product(**values) for values in rows if values['id'] not in existing]
+        if updates:
+            Product.objects.bulk_update(updates, self.update_fields)
+            self.written += len(updates)
+        if creates and self.update_only:
+            self.skipped += len(creates)
+        elif creates:
+            Product.objects.bulk_create(creates)
+            self.written += len(creates)
+            self.explicit_ids = True
+
+    def finish(self):
+        if self.explicit_ids:
+            # Rows inserted with explicit ids do not advance the PostgreSQL
+            # sequence that assigns new ones
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), [Product]):
+                    cursor.execute(sql)
+        bump_catalog_version()
+        product_row_cache.clear()
+
+
+def import_products(rows, batch_size=2000):
+    """
+    Import ``(line_number, row_dict)`` pairs, as yielded by read_rows().
+
+    Each batch is written in its own transaction. An invalid row raises
+    ProductImportError; batches before it stay imported. Returns
+    ``{'written': ..., 'skipped': ...}``.
+    """
+    importer = None
+    batch = []
+    try:
+        for line, row in rows:
+            if importer is None:
+                importer = ProductImporter(row.keys())
+            missing = [column for column in importer.columns if column not in row]
+            if missing:
+                raise ProductImportError(line, f"missing {', '.join(missing)}")
+            batch.append(_convert(line, row, importer.columns))
+            if len(batch) >= batch_size:
+                importer.write(batch)
+                batch = []
+        if batch:
+            importer.write(batch)
+    finally:
+        if importer is not None and importer.written:
+            importer.finish()
+    if importer is None:
+        return {'written': 0, 'skipped': 0}
+    return {'written': importer.written, 'skipped': importer.skipped}
+
+
+def export_products(stream, fmt, status=None, chunk_size=2000):
+    """Stream every product (optionally only one ``status``) in id order."""
+    products = Product.objects.order_by('pk')
+    if status:
+        products = products.filter(status=status)
+    rows = products.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    return write_rows(stream, fmt, rows)
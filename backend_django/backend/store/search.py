@@ -0,0 +1,73 @@
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db import connections
+from django.db.backends.ddl_references import Statement
+from django.db.models import Q
+
+SEARCH_CONFIG = 'english'
+
+
+def product_search_vector():
+    # Must match the expression of the GIN index on Product exactly, or
+    # PostgreSQL will not use the index
+    return SearchVector('name', 'description', config=SEARCH_CONFIG)
+
+
+class SearchIndex(GinIndex):
+    """
+    GIN index for full-text search. Only PostgreSQL can build it; other
+    backends (SQLite for local development) skip it, including when a later
+    migration makes SQLite rebuild the table.
+    """
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return Statement('')
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+    def remove_sql(self, model, schema_editor, **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return Statement('')
+        return super().remove_sql(model, schema_editor, **kwargs)
+
+
+def parse_price(value, name):
+    if value in (None, ''):
+        return None
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"{name} must be a number")
+    if not price.is_finite() or price < 0:
+        raise ValueError(f"{name} must be a non-negative number")
+    return price
+
+
+def search_products(queryset, query='', min_price=None, max_price=None):
+    """
+    Filter products by a free-text query and an inclusive price range.
+
+    On PostgreSQL the query is matched with full-text search against the
+    indexed name/description vector; other databases (SQLite in local
+    development) fall back to case-insensitive substring matching on
+    every word.
+    """
+    if min_price is not None:
+        queryset = queryset.filter(price__gte=min_price)
+    if max_price is not None:
+        queryset = queryset.filter(price__lte=max_price)
+
+    query = query.strip()
+    if not query:
+        return queryset
+
+    if connections[queryset.db].vendor == 'postgresql':
+        return queryset.annotate(search=product_search_vector()).filter(
+            search=SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+        )
+
+    for term in query.split():
+        queryset = queryset.filter(Q(name__icontains=term) | Q(description__icontains=term))
+    return queryset
@@ -1,15 +1,138 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
+from .lookup import get_product
 from .models import Product, CartItem
 
+PRODUCT_FIELDS = ['id', 'name', 'description', 'price', 'inventory_count', 'status', 'image', 'images', 'created_at']
+
 class ProductSerializer(serializers.ModelSerializer):
     image = serializers.ImageField(required=False)
+    images = serializers.SerializerMethodField()
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'price', 'inventory_count', 'status', 'image', 'created_at']
+        fields = PRODUCT_FIELDS
+
+    def get_images(self, product):
+        representer = getattr(self, '_representer', None)
+        if representer is None:
+            representer = self._representer = ProductRepresenter(self.context.get('request'))
+        return representer.images(product.images, product.image.name)
+
+
+# Read-only fast path for product payloads. Renders exactly the same JSON
+# as ProductSerializer but skips DRF's per-object field machinery, which
+# dominates catalog, cart and order listings.
+_CENT = Decimal('0.01')
+_image_storage = Product._meta.get_field('image').storage
+
+
+class ProductRepresenter:
+    """
+    Turns products into ProductSerializer-compatible dicts.
+
+    Everything that depends only on the request (absolute URL prefix,
+    output timezone) is resolved once up front rather than per product.
+    """
+
+    def __init__(self, request=None):
+        self.request = request
+        self.timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+        self.url_prefix = request.build_absolute_uri('/')[:-1] if request is not None else ''
+
+    def image_url(self, name):
+        if not name:
+            return None
+        url = _image_storage.url(name)
+        if self.request is None:
+            return url
+        if url.startswith('/') and not url.startswith('//') and '/.' not in url:
+            return self.url_prefix + url
+        return self.request.build_absolute_uri(url)
+
+    def images(self, images, image_name):
+        """Derivative URLs by size, or {} until they match the current image."""
+        if not image_name or images.get('source') != image_name:
+            return {}
+        return {
+            size: {
+                key: self.image_url(value) if key not in ('width', 'height') else value
+                for key, value in variant.items()
+            }
+            for size, variant in images['variants'].items()
+        }
+
+    def datetime(self, value):
+        # Mirrors serializers.DateTimeField(format=ISO_8601)
+        if self.timezone is not None:
+            if timezone.is_aware(value):
+                value = value.astimezone(self.timezone)
+            else:
+                value = timezone.make_aware(value, self.timezone)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    def from_row(self, row):
+        """Represent a ``Product.objects.values(*PRODUCT_FIELDS)`` row."""
+        return {
+            'id': row['id'],
+            'name': row['name'],
+            'description': row['description'],
+            'price': '{:f}'.format(row['price'].quantize(_CENT)),
+            'inventory_count': row['inventory_count'],
+            'status': row['status'],
+            'image': self.image_url(row['image']),
+            'images': self.images(row['images'], row['image']),
+            'created_at': self.datetime(row['created_at']),
+        }
+
+    def from_instance(self, product):
+        """Represent a Product instance."""
+        return {
+            'id': product.id,
+            'name': product.name,
+            'description': product.description,
+            'price': '{:f}'.format(product.price.quantize(_CENT)),
+            'inventory_count': product.inventory_count,
+            'status': product.status,
+            'image': self.image_url(product.image.name),
+            'images': self.images(product.images, product.image.name),
+            'created_at': self.datetime(product.created_at),
+        }
+
+
+class ProductReadField(serializers.Field):
+    """Nested, read-only product using the fast representation."""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        # One representer per bound field, i.e. per serializer instance
+        representer = getattr(self, '_representer', None)
+        if representer is None:
+            representer = self._representer = ProductRepresenter(self.context.get('request'))
+        return representer.from_instance(value)
+
+
+class ProductLookupField(serializers.PrimaryKeyRelatedField):
+    """Active product by id, resolved through store.lookup."""
+
+    def to_internal_value(self, data):
+        try:
+            return get_product(data)
+        except Product.DoesNotExist:
+            self.fail('does_not_exist', pk_value=data)
+
 
 class CartItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
-    product_id = serializers.PrimaryKeyRelatedField(
+    product = ProductReadField()
+    product_id = ProductLookupField(
         queryset=Product.objects.filter(status='active'),
         source='product',
         write_only=True
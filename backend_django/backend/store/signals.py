@@ -0,0 +1,30 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_catalog_version
+from .cart import invalidate_cart_summary
+from .images import needs_images, schedule_product_images
+from .lookup import invalidate_products
+from .models import CartItem, Product
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_catalog(sender, **kwargs):
+    # Bump after commit so readers cannot re-cache the old rows under the
+    # new version
+    transaction.on_commit(bump_catalog_version)
+    invalidate_products([kwargs['instance'].pk])
+
+
+@receiver(post_save, sender=Product)
+def generate_images(sender, instance, **kwargs):
+    if needs_images(instance):
+        schedule_product_images(instance)
+
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def invalidate_cart(sender, instance, **kwargs):
+    invalidate_cart_summary(instance.user_id)
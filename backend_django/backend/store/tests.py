@@ -1,3 +1,568 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+import io
+import os
+import tempfile
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from backend.db_routers import ReplicaRouter, is_pinned_to_primary, pin_to_primary, replica_reads
+from backend.media import parse_range
+from orders.models import Order
+
+from .cache import bump_catalog_version, get_catalog_state
+from .cart import CartError, bulk_update_cart, get_cart_summary
+from .images import DERIVED_DIR
+from .inventory import release_stock, reserve_stock
+from .lookup import get_product, product_row_cache
+from .models import CartItem, Product
+from .product_io import ProductImportError, export_products, import_products, read_rows
+
+
+def make_product(inventory_count=10, price=Decimal('10.00'), **kwargs):
+    return Product.objects.create(
+        name=kwargs.pop('name', 'Widget'), description=kwargs.pop('description', ''), price=price,
+        inventory_count=inventory_count, **kwargs
+    )
+
+
+def run_concurrently(fn, count):
+    """Run ``fn(index)`` on ``count`` threads released at the same moment."""
+    barrier = threading.Barrier(count)
+
+    def worker(index):
+        try:
+            barrier.wait()
+            return fn(index)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        return list(pool.map(worker, range(count)))
+
+
+class CatalogVersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = make_product()
+
+    def test_stock_changes_keep_cached_catalog(self):
+        version = get_catalog_state()['version']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                reserve_stock({self.product.pk: 2})
+            with transaction.atomic():
+                release_stock({self.product.pk: 1})
+
+        self.assertEqual(get_catalog_state()['version'], version)
+
+    def test_product_edit_bumps_version(self):
+        version = get_catalog_state()['version']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = Decimal('12.00')
+            self.product.save()
+
+        self.assertNotEqual(get_catalog_state()['version'], version)
+
+
+class ListQueryCountTests(TestCase):
+    """List endpoints must take the same number of queries at any page size."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def seed(self, size):
+        user = User.objects.create_user(f'lists{size}')
+        products = [make_product(name=f'Product {size}-{i}') for i in range(size)]
+        CartItem.objects.bulk_create([CartItem(user=user, product=product) for product in products])
+        self.client.force_authenticate(user)
+
+    def assert_list_queries(self, url, size, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(url, {'page_size': size})
+        self.assertEqual(response.status_code, 200)
+
+    def test_cart(self):
+        for size in (3, 30):
+            with self.subTest(size=size):
+                self.seed(size)
+                # Items joined to their products
+                self.assert_list_queries('/api/cart/', size, 1)
+
+    def test_catalog(self):
+        for size in (3, 30):
+            with self.subTest(size=size):
+                self.seed(size)
+                cache.clear()
+                # Catalog state seeded from the database, then the page
+                self.assert_list_queries('/api/products/', size, 2)
+
+
+class BulkCartTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('shopper')
+        self.widget = make_product(inventory_count=5)
+        self.gadget = make_product(name='Gadget', inventory_count=5)
+        CartItem.objects.create(user=self.user, product=self.widget, quantity=2)
+
+    def cart(self):
+        return dict(CartItem.objects.filter(user=self.user).values_list('product_id', 'quantity'))
+
+    def bulk(self, mode, items):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client.post('/api/cart/bulk/', {'mode': mode, 'items': items}, format='json')
+
+    def test_merge_adds_to_the_cart(self):
+        response = self.bulk('merge', [
+            {'product_id': self.widget.pk, 'quantity': 1},
+            {'product_id': self.gadget.pk, 'quantity': 2},
+            {'product_id': self.gadget.pk, 'quantity': 1},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cart(), {self.widget.pk: 3, self.gadget.pk: 3})
+
+    def test_set_replaces_quantities_and_zero_removes(self):
+        self.bulk('set', [
+            {'product_id': self.widget.pk, 'quantity': 0},
+            {'product_id': self.gadget.pk, 'quantity': 4},
+        ])
+
+        self.assertEqual(self.cart(), {self.gadget.pk: 4})
+
+    def test_remove_drops_products(self):
+        self.bulk('remove', [{'product_id': self.widget.pk}])
+
+        self.assertEqual(self.cart(), {})
+
+    def test_nothing_is_written_if_one_item_exceeds_inventory(self):
+        response = self.bulk('merge', [
+            {'product_id': self.gadget.pk, 'quantity': 1},
+            {'product_id': self.widget.pk, 'quantity': 4},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['products'], [self.widget.pk])
+        self.assertEqual(self.cart(), {self.widget.pk: 2})
+
+    def test_unknown_product_is_rejected(self):
+        with self.assertRaises(CartError) as raised:
+            bulk_update_cart(self.user, 'merge', {self.gadget.pk: 1, 999999: 1})
+
+        self.assertEqual(raised.exception.product_ids, [999999])
+        self.assertEqual(self.cart(), {self.widget.pk: 2})
+
+
+class CartSummaryCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('shopper')
+        self.product = make_product(inventory_count=5)
+        CartItem.objects.create(user=self.user, product=self.product, quantity=2)
+
+    def test_summary_is_served_from_cache(self):
+        summary = get_cart_summary(self.user)
+
+        self.assertEqual(summary, {'item_count': 2, 'subtotal': '20.00', 'warnings': []})
+        with self.assertNumQueries(0):
+            self.assertEqual(get_cart_summary(self.user), summary)
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.get('/api/cart/summary/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['item_count'], 2)
+
+    def test_cart_write_invalidates(self):
+        get_cart_summary(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CartItem.objects.filter(user=self.user).get().delete()
+
+        self.assertEqual(get_cart_summary(self.user)['item_count'], 0)
+
+    def test_bulk_cart_write_invalidates(self):
+        get_cart_summary(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_update_cart(self.user, 'merge', {self.product.pk: 1})
+
+        self.assertEqual(get_cart_summary(self.user)['item_count'], 3)
+
+    def test_catalog_version_bump_invalidates(self):
+        get_cart_summary(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = Decimal('12.50')
+            self.product.inventory_count = 1
+            self.product.save()
+
+        summary = get_cart_summary(self.user)
+        self.assertEqual(summary['subtotal'], '25.00')
+        self.assertEqual(summary['warnings'], [{
+            'product_id': self.product.pk, 'name': 'Widget', 'quantity': 2, 'available': 1,
+        }])
+
+
+class ConcurrentCartMergeTests(TransactionTestCase):
+    def test_concurrent_merges_of_a_new_product_add_up(self):
+        user = User.objects.create_user('shopper')
+        product = make_product(inventory_count=100)
+
+        run_concurrently(lambda index: bulk_update_cart(user, 'merge', {product.pk: 1}), 8)
+
+        self.assertEqual(CartItem.objects.get(user=user, product=product).quantity, 8)
+
+
+class ProductSearchTests(TestCase):
+    """Runs the substring fallback here; PostgreSQL uses full-text search instead."""
+
+    def setUp(self):
+        cache.clear()
+        make_product(name='Red Kettle', description='Stainless steel', price=Decimal('25.00'))
+        make_product(name='Blue Kettle', description='Enamel', price=Decimal('40.00'))
+        make_product(name='Steel Mug', price=Decimal('8.00'))
+        make_product(name='Retired Kettle', price=Decimal('30.00'), status='inactive')
+
+    def search(self, **params):
+        return APIClient().get('/api/products/search/', params)
+
+    def names(self, **params):
+        response = self.search(**params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(product['name'] for product in response.data['results'])
+
+    def test_matches_every_word_in_name_or_description(self):
+        self.assertEqual(self.names(q='kettle'), ['Blue Kettle', 'Red Kettle'])
+        self.assertEqual(self.names(q='STEEL'), ['Red Kettle', 'Steel Mug'])
+        self.assertEqual(self.names(q='kettle steel'), ['Red Kettle'])
+
+    def test_price_range_is_inclusive(self):
+        self.assertEqual(self.names(min_price='8', max_price='25'), ['Red Kettle', 'Steel Mug'])
+        self.assertEqual(self.names(q='kettle', min_price='25.01'), ['Blue Kettle'])
+
+    def test_rejects_invalid_price_bounds(self):
+        for value in ('cheap', '-1', 'NaN', 'Infinity'):
+            with self.subTest(value=value):
+                response = self.search(min_price=value)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('min_price', response.data['detail'])
+        self.assertEqual(self.search(max_price='x').status_code, 400)
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        override = override_settings(MEDIA_ROOT=media_root.name, MEDIA_SENDFILE='')
+        override.enable()
+        self.addCleanup(override.disable)
+        self.write('products/photo.jpg', b'0123456789')
+        self.write('products/empty.jpg', b'')
+
+    def write(self, path, content):
+        full_path = os.path.join(settings.MEDIA_ROOT, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as f:
+            f.write(content)
+
+    def get(self, path='products/photo.jpg', **headers):
+        return self.client.get(f'/media/{path}', headers=headers)
+
+    def test_whole_file(self):
+        response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}')
+
+    def test_byte_ranges(self):
+        for header, content, content_range in (
+            ('bytes=2-5', b'2345', 'bytes 2-5/10'),
+            ('bytes=7-', b'789', 'bytes 7-9/10'),
+            ('bytes=-3', b'789', 'bytes 7-9/10'),
+            ('bytes=8-100', b'89', 'bytes 8-9/10'),
+        ):
+            with self.subTest(header):
+                response = self.get(Range=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(b''.join(response.streaming_content), content)
+                self.assertEqual(response['Content-Range'], content_range)
+
+    def test_unsatisfiable_ranges(self):
+        for path, header in (
+            ('products/photo.jpg', 'bytes=10-'),
+            ('products/photo.jpg', 'bytes=-0'),
+            ('products/empty.jpg', 'bytes=-5'),
+            ('products/empty.jpg', 'bytes=0-'),
+        ):
+            with self.subTest(path=path, header=header):
+                response = self.get(path, Range=header)
+                self.assertEqual(response.status_code, 416)
+        self.assertIs(parse_range('bytes=-5', 0), False)
+
+    def test_malformed_range_sends_whole_file(self):
+        self.assertEqual(self.get(Range='bytes=0-1,4-5').status_code, 200)
+
+    def test_if_range(self):
+        etag = self.get()['ETag']
+
+        self.assertEqual(self.get(Range='bytes=0-1', **{'If-Range': etag}).status_code, 206)
+        self.assertEqual(self.get(Range='bytes=0-1', **{'If-Range': '"stale"'}).status_code, 200)
+
+    def test_not_modified(self):
+        etag = self.get()['ETag']
+
+        response = self.get(**{'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_derivatives_are_immutable(self):
+        self.write(f'{DERIVED_DIR}/photo-card.webp', b'webp')
+
+        self.assertIn('immutable', self.get(f'{DERIVED_DIR}/photo-card.webp')['Cache-Control'])
+
+    def test_missing_and_escaping_paths(self):
+        self.assertEqual(self.get('products/missing.jpg').status_code, 404)
+        self.assertEqual(self.get('../settings.py').status_code, 404)
+
+    def test_x_accel_redirect(self):
+        with override_settings(MEDIA_SENDFILE='x-accel-redirect', MEDIA_ACCEL_REDIRECT_PREFIX='/protected/'):
+            response = self.get(Range='bytes=0-1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/products/photo.jpg')
+        self.assertEqual(response.content, b'')
+
+    def test_x_sendfile(self):
+        with override_settings(MEDIA_SENDFILE='x-sendfile'):
+            response = self.get()
+
+        self.assertEqual(response['X-Sendfile'], os.path.join(settings.MEDIA_ROOT, 'products/photo.jpg'))
+        self.assertEqual(response.content, b'')
+
+
+class ProductImportExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.kettle = make_product(name='Kettle', price=Decimal('25.00'))
+        self.mug = make_product(name='Mug', price=Decimal('8.00'))
+
+    def import_csv(self, text, batch_size=2000, upsert=True):
+        # SQLite can upsert; upsert=False takes the bulk_update fallback
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', upsert):
+            return import_products(read_rows(io.StringIO(text), 'csv'), batch_size)
+
+    def prices(self):
+        return dict(Product.objects.values_list('name', 'price'))
+
+    def check_upsert(self, upsert):
+        new_id = self.mug.pk + 100
+        result = self.import_csv(
+            'id,name,price,inventory_count\n'
+            f'{self.kettle.pk},Kettle,27.50,4\n'
+            ',Teapot,30,2\n'
+            f'{new_id},Saucer,3.5,\n',
+            upsert=upsert,
+        )
+
+        self.assertEqual(result, {'written': 3, 'skipped': 0})
+        self.assertEqual(self.prices(), {
+            'Kettle': Decimal('27.50'), 'Mug': Decimal('8.00'),
+            'Teapot': Decimal('30.00'), 'Saucer': Decimal('3.50'),
+        })
+        self.assertEqual(Product.objects.get(pk=new_id).name, 'Saucer')
+        # New rows still get fresh ids after explicit ones were inserted
+        self.assertGreater(make_product().pk, new_id)
+
+    def test_upserts_on_id_and_creates_rows_without_one(self):
+        self.check_upsert(upsert=True)
+
+    def test_bulk_update_fallback(self):
+        self.check_upsert(upsert=False)
+
+    def test_update_only_file_skips_unknown_ids(self):
+        result = self.import_csv(f'id,price\n{self.kettle.pk},20\n999999,1\n')
+
+        self.assertEqual(result, {'written': 1, 'skipped': 1})
+        self.assertEqual(self.prices(), {'Kettle': Decimal('20.00'), 'Mug': Decimal('8.00')})
+        self.assertFalse(Product.objects.filter(pk=999999).exists())
+
+    def test_last_row_wins_for_a_repeated_id(self):
+        self.import_csv(f'id,price\n{self.kettle.pk},20\n{self.kettle.pk},21\n')
+
+        self.assertEqual(self.prices()['Kettle'], Decimal('21.00'))
+
+    def test_invalid_row_keeps_earlier_batches(self):
+        with self.assertRaises(ProductImportError) as raised:
+            self.import_csv(
+                'name,price\nA,1\nB,2\nC,3\nD,free\n', batch_size=2
+            )
+
+        self.assertEqual(raised.exception.line, 5)
+        self.assertIn('price', raised.exception.message)
+        self.assertEqual(
+            set(Product.objects.values_list('name', flat=True)), {'Kettle', 'Mug', 'A', 'B'}
+        )
+
+    def test_import_invalidates_the_catalog(self):
+        version = get_catalog_state()['version']
+        get_product(self.kettle.pk)
+
+        self.import_csv(f'id,price\n{self.kettle.pk},20\n')
+
+        self.assertNotEqual(get_catalog_state()['version'], version)
+        self.assertEqual(get_product(self.kettle.pk).price, Decimal('20.00'))
+
+    def test_export_imports_back_unchanged(self):
+        for fmt in ('csv', 'jsonl'):
+            with self.subTest(fmt=fmt):
+                before = list(Product.objects.order_by('pk').values())
+                stream = io.StringIO()
+                self.assertEqual(export_products(stream, fmt), 2)
+
+                stream.seek(0)
+                result = import_products(read_rows(stream, fmt))
+
+                self.assertEqual(result, {'written': 2, 'skipped': 0})
+                after = list(Product.objects.order_by('pk').values())
+                for row in before + after:
+                    del row['updated_at']
+                self.assertEqual(after, before)
+
+
+class ProductLookupCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        product_row_cache.clear()
+        self.product = make_product()
+
+    def change_price_elsewhere(self, price):
+        # A write in another process: this one's rows are not dropped
+        Product.objects.filter(pk=self.product.pk).update(price=price)
+
+    def test_rows_are_cached_across_lookups(self):
+        get_product(self.product.pk)
+        self.change_price_elsewhere(Decimal('12.00'))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_product(self.product.pk).price, Decimal('10.00'))
+
+    def test_catalog_version_bump_invalidates_cached_rows(self):
+        get_product(self.product.pk)
+        self.change_price_elsewhere(Decimal('12.00'))
+        bump_catalog_version()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_product(self.product.pk).price, Decimal('12.00'))
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    ``default`` and ``replica`` are separate test databases here, so a row
+    written to only one of them shows which database a read went to.
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        # Turned on per test, not per class, so that it is off again when
+        # the databases are flushed: flush skips tables the router does
+        # not migrate, which includes a replica's
+        replica = override_settings(REPLICA_DATABASES=['replica'])
+        replica.enable()
+        self.addCleanup(replica.disable)
+        self.product = make_product(name='On primary')
+        Product.objects.using('replica').create(
+            pk=self.product.pk, name='On replica', description='',
+            price=self.product.price, inventory_count=self.product.inventory_count,
+        )
+
+    def test_router_reads_replica_only_inside_replica_reads(self):
+        router = ReplicaRouter()
+
+        self.assertIsNone(router.db_for_read(Product))
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Product), 'replica')
+            self.assertEqual(Product.objects.get(pk=self.product.pk).name, 'On replica')
+            with replica_reads(False):
+                self.assertIsNone(router.db_for_read(Product))
+
+    def test_no_replica_reads_inside_a_transaction(self):
+        with replica_reads(), transaction.atomic():
+            self.assertIsNone(ReplicaRouter().db_for_read(Product))
+            self.assertEqual(Product.objects.get(pk=self.product.pk).name, 'On primary')
+
+    def test_writes_go_to_primary(self):
+        with replica_reads():
+            self.assertEqual(ReplicaRouter().db_for_write(Product), 'default')
+            created = make_product(name='New')
+            Product.objects.filter(pk=self.product.pk).update(name='Renamed')
+
+        self.assertTrue(Product.objects.using('default').filter(pk=created.pk).exists())
+        self.assertFalse(Product.objects.using('replica').filter(pk=created.pk).exists())
+        self.assertEqual(Product.objects.using('default').get(pk=self.product.pk).name, 'Renamed')
+        self.assertEqual(Product.objects.using('replica').get(pk=self.product.pk).name, 'On replica')
+
+    @override_settings(READ_YOUR_WRITES_SECONDS=0)
+    def test_product_list_reads_replica(self):
+        response = APIClient().get('/api/products/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['name'] for p in response.data['results']], ['On replica'])
+
+    def test_product_list_reads_primary_just_after_a_catalog_write(self):
+        response = APIClient().get('/api/products/')
+
+        self.assertEqual([p['name'] for p in response.data['results']], ['On primary'])
+
+    def test_order_list_reads_replica_unless_pinned(self):
+        user = User.objects.create_user('buyer')
+        Order.objects.create(user=user, total_amount=Decimal('10.00'))
+        # The replica has the user but not the new order yet
+        User.objects.using('replica').create(pk=user.pk, username=user.username)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        self.assertEqual(client.get('/api/orders/').data['results'], [])
+        pin_to_primary(user.pk)
+        self.assertEqual(len(client.get('/api/orders/').data['results']), 1)
+
+    def test_write_request_pins_user_to_primary(self):
+        user = User.objects.create_user('shopper')
+        client = APIClient()
+        client.force_authenticate(user)
+        self.assertFalse(is_pinned_to_primary(user.pk))
+
+        response = client.post('/api/cart/', {'product_id': self.product.pk, 'quantity': 1}, format='json')
+
+        self.assertLess(response.status_code, 400)
+        self.assertTrue(is_pinned_to_primary(user.pk))
+
+    def test_failed_write_request_does_not_pin(self):
+        user = User.objects.create_user('shopper')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.post('/api/cart/', {}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(is_pinned_to_primary(user.pk))
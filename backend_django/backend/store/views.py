@@ -1,12 +1,85 @@
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
+from backend.db_routers import ReplicaReadMixin, replica_reads
+from .cache import catalog_etag, catalog_page_key, get_catalog_state
+from .lookup import get_product
+from .cart import BULK_MODES, CartError, bulk_update_cart, get_cart_summary, parse_bulk_items
 from .models import Product, CartItem
-from .serializers import ProductSerializer, CartItemSerializer
+from .pagination import ProductCursorPagination
+from .search import parse_price, search_products
+from .serializers import (
+    PRODUCT_FIELDS,
+    CartItemSerializer,
+    ProductRepresenter,
+    ProductSerializer,
+)
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+class ProductViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Product.objects.filter(status='active')
     serializer_class = ProductSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = ProductCursorPagination
+    replica_actions = ('list', 'retrieve', 'search')
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_page(request, self.filter_queryset(self.get_queryset()))
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        try:
+            min_price = parse_price(request.query_params.get('min_price'), 'min_price')
+            max_price = parse_price(request.query_params.get('max_price'), 'max_price')
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = search_products(
+            self.filter_queryset(self.get_queryset()),
+            query=request.query_params.get('q', ''),
+            min_price=min_price,
+            max_price=max_price,
+        )
+        return self._cached_page(request, queryset)
+
+    def _cached_page(self, request, queryset):
+        # Serialized pages are cached under the catalog version, which
+        # changes on every product write, so stale pages are never served
+        state = get_catalog_state()
+        etag = catalog_etag(state, request)
+        last_modified = state['last_modified'].timestamp()
+
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            return not_modified
+
+        key = catalog_page_key(state, request)
+        data = cache.get(key)
+        if data is None:
+            # Just after a product write a lagging replica could get its old
+            # rows cached under the new version, so read the primary instead
+            age = (timezone.now() - state['last_modified']).total_seconds()
+            fresh = age < settings.READ_YOUR_WRITES_SECONDS
+            with replica_reads(False) if fresh else nullcontext():
+                page = self.paginate_queryset(queryset.values(*PRODUCT_FIELDS))
+            representer = ProductRepresenter(request)
+            data = self.get_paginated_response(
+                [representer.from_row(row) for row in page]
+            ).data
+            cache.set(key, data, settings.CATALOG_CACHE_TIMEOUT)
+
+        response = Response(data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
 
 class CartItemViewSet(viewsets.ModelViewSet):
     serializer_class = CartItemSerializer
@@ -30,7 +103,7 @@ class CartItemViewSet(viewsets.ModelViewSet):
         quantity = int(request.data.get('quantity', 1))
         
         try:
-            product = Product.objects.get(pk=product_id)
+            product = get_product(product_id)
         except Product.DoesNotExist:
             return Response(
                 {'error': 'Product not found'},
@@ -70,6 +143,39 @@ class CartItemViewSet(viewsets.ModelViewSet):
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
     
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Merge, set or remove many cart items in one request, e.g. to sync a
+        guest cart after login:
+
+            {"mode": "merge", "items": [{"product_id": 1, "quantity": 2}, ...]}
+
+        Responds with the whole cart.
+        """
+        mode = request.data.get('mode', 'merge')
+        if mode not in BULK_MODES:
+            return Response(
+                {'error': f"mode must be one of {', '.join(BULK_MODES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            quantities = parse_bulk_items(mode, request.data.get('items'))
+            bulk_update_cart(request.user, mode, quantities)
+        except CartError as e:
+            return Response(
+                {'error': e.message, 'products': e.product_ids},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = self.get_serializer(self.get_queryset(), many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        return Response(get_cart_summary(request.user))
+
     # ... keep existing update method ...    
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -0,0 +1,12 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import user_state_cache
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_user_state(sender, instance, **kwargs):
+    transaction.on_commit(lambda: user_state_cache.invalidate(str(instance.pk)))
@@ -1,3 +1,72 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import user_state_cache
+
+
+class StatelessJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        user_state_cache.clear()
+        self.addCleanup(user_state_cache.clear)
+        self.user = User.objects.create_user('shopper')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+        patcher = mock.patch('backend.caching.time')
+        self.clock = patcher.start().monotonic
+        self.addCleanup(patcher.stop)
+        self.clock.return_value = 1000.0
+
+    def get_orders(self):
+        return self.client.get('/api/orders/')
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_orders()
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries if 'auth_user' in query['sql']]
+
+    def test_cached_user_loads_no_user_row(self):
+        self.assertEqual(len(self.user_queries()), 1)
+        self.assertEqual(self.user_queries(), [])
+
+    def test_deactivating_a_user_revokes_their_token_at_once(self):
+        self.get_orders()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        self.assertEqual(self.get_orders().status_code, 401)
+
+    def test_change_from_another_process_applies_within_the_ttl(self):
+        self.get_orders()
+        # No signal reaches this process's cache
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        self.assertEqual(self.get_orders().status_code, 200)
+        self.clock.return_value += user_state_cache.ttl
+        self.assertEqual(self.get_orders().status_code, 401)
+
+    def test_deleted_user_is_rejected(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+
+        response = self.get_orders()
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['code'], 'user_not_found')
+
+    def test_saving_a_user_drops_their_cached_state(self):
+        self.get_orders()
+        self.assertIsNotNone(user_state_cache.get(str(self.user.pk)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
 
-# Create your tests here.
+        self.assertIsNone(user_state_cache.get(str(self.user.pk)))
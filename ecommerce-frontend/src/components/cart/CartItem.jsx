@@ -1,6 +1,7 @@
 import { Box, Typography, TextField, IconButton, Avatar } from '@mui/material';
 import DeleteIcon from '@mui/icons-material/Delete';
 import {useCart} from '../../context/CartContext';
+import { productImageUrl } from '../../utils/helpers';
 
 const CartItem = ({ item }) => {
   const { updateQuantity, removeFromCart } = useCart();
@@ -16,7 +17,7 @@ const CartItem = ({ item }) => {
     <Box sx={{ display: 'flex', gap: 2 }}>
       <Avatar 
         variant="square"
-        src={item.image_url}
+        src={productImageUrl(item, 'thumb')}
         sx={{ width: 100, height: 100 }}
       />
       
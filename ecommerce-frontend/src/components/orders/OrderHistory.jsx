@@ -1,11 +1,13 @@
 import { useState, useEffect } from 'react';
-import { Box, Typography, CircularProgress, List } from '@mui/material';
+import { Box, Typography, CircularProgress, List, Button } from '@mui/material';
 import OrderItem from './OrderItem';
 import { getOrderHistory } from '../../services/orderService';
 import useAuth from '../../hooks/useAuth';
 
 const OrderHistory = () => {
   const [orders, setOrders] = useState([]);
+  const [nextUrl, setNextUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const { isAuthenticated } = useAuth();
@@ -16,7 +18,8 @@ const OrderHistory = () => {
     const fetchOrders = async () => {
       try {
         const data = await getOrderHistory();
-        setOrders(data);
+        setOrders(data.results);
+        setNextUrl(data.next);
       } catch (err) {
         setError(err.response?.data?.message || 'Failed to load orders');
       } finally {
@@ -27,6 +30,19 @@ const OrderHistory = () => {
     fetchOrders();
   }, [isAuthenticated]);
 
+  const handleLoadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const data = await getOrderHistory(nextUrl);
+      setOrders((current) => [...current, ...data.results]);
+      setNextUrl(data.next);
+    } catch (err) {
+      setError(err.response?.data?.message || 'Failed to load orders');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   if (!isAuthenticated) {
     return (
       <Box sx={{ p: 3, textAlign: 'center' }}>
@@ -74,6 +90,14 @@ const OrderHistory = () => {
           <OrderItem key={order.id} order={order} />
         ))}
       </List>
+
+      {nextUrl && (
+        <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+          <Button variant="outlined" onClick={handleLoadMore} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </Button>
+        </Box>
+      )}
     </Box>
   );
 };
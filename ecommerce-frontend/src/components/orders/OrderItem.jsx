@@ -13,7 +13,7 @@ import {
   Chip
 } from '@mui/material';
 import ExpandMoreIcon from '@mui/icons-material/ExpandMore';
-import { formatDate } from '../../utils/helpers';
+import { formatDate, productImageUrl } from '../../utils/helpers';
 
 const OrderItem = ({ order }) => {
   const [expanded, setExpanded] = useState(false);
@@ -78,7 +78,7 @@ const OrderItem = ({ order }) => {
           {order.items.map((item) => (
             <ListItem key={item.id} sx={{ py: 1 }}>
               <Avatar 
-                src={item.product.image_url} 
+                src={productImageUrl(item.product, 'thumb')}
                 variant="square"
                 sx={{ width: 60, height: 60, mr: 2 }}
               />
@@ -1,6 +1,7 @@
 import { Card, CardMedia, CardContent, CardActions, Typography, Button } from '@mui/material';
 import { Link } from 'react-router-dom';
 import {useCart} from '../../context/CartContext';
+import { productImageUrl } from '../../utils/helpers';
 
 const ProductCard = ({ product, onViewDetail, showAddToCart }) => {
   const { addToCart } = useCart();
@@ -15,7 +16,7 @@ const ProductCard = ({ product, onViewDetail, showAddToCart }) => {
       <CardMedia
         component="img"
         height="200"
-        image={product.image_url || '/placeholder-product.png'}
+        image={productImageUrl(product, 'card')}
         alt={product.name}
         sx={{ objectFit: 'contain', p: 1, bgcolor: '#f5f5f5' }}
       />
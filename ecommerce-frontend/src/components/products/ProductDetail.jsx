@@ -12,6 +12,7 @@ import {
 } from '@mui/material';
 import { getProductDetail } from '../../services/productService';
 import {useCart} from '../../context/CartContext';
+import { productImageUrl } from '../../utils/helpers';
 
 const ProductDetail = () => {
   const { id } = useParams();
@@ -75,7 +76,7 @@ const ProductDetail = () => {
         <Grid item xs={12} md={6}>
           <Avatar
             variant="square"
-            src={product.image_url || '/placeholder-product.png'}
+            src={productImageUrl(product, 'large')}
             sx={{ 
               width: '100%', 
               height: 'auto',
@@ -2,7 +2,6 @@ import { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { 
   Grid, 
-  Pagination, 
   TextField, 
   Box, 
   CircularProgress, 
@@ -10,14 +9,15 @@ import {
   Button
 } from '@mui/material';
 import ProductCard from './ProductCard';
-import { getProducts } from '../../services/productService';
+import { getProducts, getCursor } from '../../services/productService';
 import useAuth from '../../hooks/useAuth';
 
 const ProductGrid = () => {
   const [products, setProducts] = useState([]);
   const [loading, setLoading] = useState(true);
-  const [page, setPage] = useState(1);
-  const [totalPages, setTotalPages] = useState(1);
+  const [cursor, setCursor] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [prevCursor, setPrevCursor] = useState(null);
   const [searchTerm, setSearchTerm] = useState('');
   const [error, setError] = useState(null);
   const { isAuthenticated } = useAuth();
@@ -28,19 +28,17 @@ const ProductGrid = () => {
       try {
         setLoading(true);
         setError(null);
-        const response = await getProducts(page, searchTerm);
-        
-        console.log('API Response:', response); // Keep this for debugging
+        const response = await getProducts(cursor, searchTerm);
 
-        // Handle the direct array response
-        if (Array.isArray(response)) {
-          setProducts(response);
-          // Since your API doesn't return pagination data, we'll assume single page
-          setTotalPages(1);
+        // Cursor-paginated response: { next, previous, results }
+        if (Array.isArray(response?.results)) {
+          setProducts(response.results);
+          setNextCursor(getCursor(response.next));
+          setPrevCursor(getCursor(response.previous));
         } else {
-          // If the response isn't an array (unexpected format)
           setProducts([]);
-          setTotalPages(1);
+          setNextCursor(null);
+          setPrevCursor(null);
           setError('Unexpected data format received');
         }
       } catch (error) {
@@ -53,19 +51,15 @@ const ProductGrid = () => {
     };
 
     fetchProducts();
-  }, [page, searchTerm]);
-
-  const handlePageChange = (event, value) => {
-    setPage(value);
-  };
+  }, [cursor, searchTerm]);
 
   const handleSearch = (e) => {
     setSearchTerm(e.target.value);
-    setPage(1); // Reset to first page when searching
+    setCursor(null); // Reset to first page when searching
   };
 
   const handleRetry = () => {
-    setPage(1);
+    setCursor(null);
     setSearchTerm('');
     setError(null);
   };
@@ -126,15 +120,22 @@ const ProductGrid = () => {
           </Grid>
           
           {/* Only show pagination if we actually have multiple pages */}
-          {totalPages > 1 && (
-            <Box display="flex" justifyContent="center" mt={4}>
-              <Pagination
-                count={totalPages}
-                page={page}
-                onChange={handlePageChange}
-                color="primary"
-                shape="rounded"
-              />
+          {(prevCursor || nextCursor) && (
+            <Box display="flex" justifyContent="center" gap={2} mt={4}>
+              <Button
+                variant="outlined"
+                disabled={!prevCursor}
+                onClick={() => setCursor(prevCursor)}
+              >
+                Previous
+              </Button>
+              <Button
+                variant="outlined"
+                disabled={!nextCursor}
+                onClick={() => setCursor(nextCursor)}
+              >
+                Next
+              </Button>
             </Box>
           )}
         </>
@@ -1,7 +1,10 @@
 import api from './api';
 
-export const syncCart = async (cartItems) => {
-  const response = await api.post('/cart/sync/', { items: cartItems });
+// Merges a guest cart (items as stored by CartContext) into the user's cart
+// in a single request
+export const syncCart = async (cartItems, mode = 'merge') => {
+  const items = cartItems.map(item => ({ product_id: item.id, quantity: item.quantity }));
+  const response = await api.post('/cart/bulk/', { mode, items });
   return response.data;
 };
 
@@ -10,6 +13,12 @@ export const getCartItems = async () => {
   return response.data;
 };
 
+// { item_count, subtotal, warnings: [{ product_id, name, quantity, available }] }
+export const getCartSummary = async () => {
+  const response = await api.get('/cart/summary/');
+  return response.data;
+};
+
 export const updateCartItem = async (itemId, quantity) => {
   const response = await api.put(`/cart/${itemId}/`, { quantity });
   return response.data;
@@ -1,12 +1,37 @@
 import api from './api';
 
+const CHECKOUT_POLL_INTERVAL_MS = 500;
+const CHECKOUT_POLL_ATTEMPTS = 60;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// In async checkout mode the server answers 202 and creates the PayPal
+// order in the background; poll until the PayPal order id is available.
+const waitForCheckout = async (orderId) => {
+  for (let attempt = 0; attempt < CHECKOUT_POLL_ATTEMPTS; attempt++) {
+    const response = await api.get(`/orders/${orderId}/checkout-status/`);
+    if (response.data.status === 'failed') {
+      throw new Error('Failed to create PayPal order');
+    }
+    if (response.data.id) {
+      return response.data;
+    }
+    await sleep(CHECKOUT_POLL_INTERVAL_MS);
+  }
+  throw new Error('Timed out waiting for PayPal order');
+};
+
 export const createOrder = async (orderData) => {
   const response = await api.post('/orders/', orderData);
+  if (response.status === 202) {
+    return waitForCheckout(response.data.order);
+  }
   return response.data;
 };
 
-export const getOrderHistory = async () => {
-  const response = await api.get('/orders/');
+// Cursor-paginated: pass the previous response's `next` URL to load more
+export const getOrderHistory = async (nextUrl = null) => {
+  const response = nextUrl ? await api.get(nextUrl) : await api.get('/orders/');
   return response.data;
 };
 
@@ -1,12 +1,25 @@
 import api from './api';
 
-export const getProducts = async (page = 1, search = '', filters = {}) => {
-  const response = await api.get('/products/', {
-    params: { page, search, ...filters }
-  });
+// The catalog is cursor-paginated: pass the cursor from a previous
+// response's next/previous link to move between pages.
+// Searches go to the full-text search endpoint, which also accepts
+// min_price / max_price filters.
+export const getProducts = async (cursor = null, search = '', filters = {}) => {
+  const params = { ...filters };
+  if (cursor) params.cursor = cursor;
+  if (search) params.q = search;
+  const url = search || filters.min_price || filters.max_price
+    ? '/products/search/'
+    : '/products/';
+  const response = await api.get(url, { params });
   return response.data;
 };
 
+export const getCursor = (url) => {
+  if (!url) return null;
+  return new URL(url).searchParams.get('cursor');
+};
+
 export const getProductDetail = async (id) => {
   const response = await api.get(`/products/${id}/`);
   return response.data;
@@ -29,4 +29,11 @@ export const formatCurrency = (amount) => {
     style: 'currency',
     currency: 'USD'
   }).format(amount);
-};
\ No newline at end of file
+};
+
+// Best URL for a product image at one of the backend's derivative sizes
+// ('thumb', 'card', 'large'), falling back to the original upload
+export const productImageUrl = (product, size = 'card') => {
+  const variant = product?.images?.[size];
+  return variant?.webp || product?.image || '/placeholder-product.png';
+};